@@ -0,0 +1,218 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+##  Benchmark of the report pages, on a synthetic registry of configurable size. Doesn't need Cura, Qt or a GPU.
+#
+#   Usage, from the root of the repository:
+#     python benchmarks/benchmark_reports.py [--materials N] [--keys M] [--properties K] [--save results.json]
+#                                           [--baseline benchmarks/baseline.json]
+#
+#   The snapshots of the registry are taken with SnapshotBuilder, like the menu items take them on the main thread,
+#   and then every page is rendered with an empty render cache. The wall time is the best of --repeat runs, the peak
+#   memory is measured with tracemalloc in a separate run, because tracing slows everything down. With
+#   --baseline, every result is compared with the result of the same stage in that file.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from synthetic_cura import ContainerStack, DefinitionContainer, InstanceContainer, SettingDefinition, SettingFunction, installUraniumStandIns
+
+# Properties of the keys in the definition, the first --properties of them are used.
+setting_prop_names = ["value", "default_value", "type", "label", "description", "unit", "minimum_value", "maximum_value", "enabled", "resolve"]
+installUraniumStandIns(setting_prop_names)
+
+from GodMode.ChangeTracker import ChangeTracker
+from GodMode.CompactReport import compactHtmlPage
+from GodMode.DataProvider import DataProvider
+from GodMode.ReportFormat import htmlPage, containersOfTypeHtmlPage, allStacksHtmlPage, effectiveValuesHtmlPage, render_cache
+from GodMode.SnapshotBuilder import SnapshotBuilder
+
+# The instance container types in a stack, top to bottom, and the share of the keys they set.
+stack_layers = [("user", 0.02), ("quality_changes", 0.05), ("quality", 0.1), ("material", 0.2), ("variant", 0.05), ("definition_changes", 0.02)]
+
+##  An in-memory registry of containers and stacks with made-up settings, with the sizes of a real one.
+#
+#   The containers and stacks behave like the ones of Cura (see synthetic_cura), and are copied into snapshots by
+#   SnapshotBuilder, like CuraDataProvider does.
+class SyntheticRegistry(DataProvider):
+    ##  \param materials Number of material containers.
+    #   \param keys Number of setting keys in the definition.
+    #   \param properties Number of properties of every key in the definition.
+    #   \param machines Number of printers, each with a global stack and extruder stacks.
+    def __init__(self, materials=200, keys=500, properties=4, machines=4, extruders=2, seed=1):
+        self._random = random.Random(seed)
+        self._change_tracker = ChangeTracker()
+        self._keys = ["setting_%04d" % position for position in range(keys)]
+        self._positions = {key: position for position, key in enumerate(self._keys)}
+        properties = setting_prop_names[:max(1, min(properties, len(setting_prop_names)))]
+
+        self._definition = DefinitionContainer("fdmprinter", [self._settingDefinition(position, properties) for position in range(keys)])
+        self._containers = {"machine": [self._definition]}
+        for type_, count in [("material", materials), ("quality", materials // 4 + 1), ("variant", 8), ("user", machines * (extruders + 1)),
+                             ("quality_changes", machines), ("definition_changes", machines * (extruders + 1))]:
+            share = dict(stack_layers)[type_]
+            self._containers[type_] = [InstanceContainer(type_ + "_%d" % position, type_, self._definition,
+                                                         {key: self._value(key) for key in self._sample(share)}) for position in range(count)]
+
+        self._stacks = []
+        self._active = None
+        for machine in range(machines):
+            global_stack = self._stack("machine_%d" % machine, "machine")
+            stacks = [global_stack] + [self._stack("machine_%d_extruder_%d" % (machine, extruder), "extruder_train", global_stack) for extruder in range(extruders)]
+            self._stacks += stacks
+            if self._active is None:
+                self._active = stacks
+
+    def activeStacks(self, with_container_keys=True):
+        builder = SnapshotBuilder(self._change_tracker)
+        stacks = [builder.snapshotStack(stack, with_container_keys=with_container_keys) for stack in self._active]
+        return stacks[0], stacks[1:]
+
+    def containersOfType(self, type_):
+        builder = SnapshotBuilder(self._change_tracker)
+        return [builder.snapshotContainer(container) for container in self._containers.get(type_, [])]
+
+    def allStacks(self, with_container_keys=True):
+        builder = SnapshotBuilder(self._change_tracker)
+        return sorted((builder.snapshotStack(stack, with_container_keys=with_container_keys) for stack in self._stacks), key=lambda x: x.container_id)
+
+    def _sample(self, share):
+        return sorted(self._random.sample(self._keys, max(1, int(len(self._keys) * share))))
+
+    ##  A number, a boolean, or an expression of keys that come before the key, so the keys don't depend on each other
+    #   in circles.
+    def _value(self, key, allow_expression=True):
+        kind = self._random.random()
+        position = self._positions[key]
+        if kind < 0.6 or not allow_expression or position == 0:
+            return round(self._random.uniform(0, 300), 2)
+        if kind < 0.8:
+            return self._random.choice([True, False])
+        earlier_keys = self._keys[:position]
+        return SettingFunction(self._random.choice(earlier_keys) + " * 2 if " + self._random.choice(earlier_keys) + " else 0")
+
+    def _settingDefinition(self, position, properties):
+        key = self._keys[position]
+        values = {prop_name: self._value(key, allow_expression=prop_name == "value") for prop_name in properties}
+        if self._random.random() < 0.05:
+            values["resolve"] = SettingFunction("max(extruderValues('" + key + "'))")
+        if self._random.random() < 0.1:
+            values["settable_per_extruder"] = False
+        return SettingDefinition(key, values)
+
+    def _stack(self, stack_id, type_, next_stack=None):
+        containers = [self._random.choice(self._containers[layer_type]) for layer_type, _ in stack_layers] + [self._definition]
+        return ContainerStack(stack_id, type_, containers, next_stack)
+
+##  The snapshots that the menu items of the pages take on the main thread, as (name, function that takes them).
+def benchmarkSnapshots(registry):
+    return [
+        ("snapshot active stacks", lambda: registry.activeStacks()),
+        ("snapshot materials", lambda: registry.containersOfType("material")),
+        ("snapshot all stacks", lambda: registry.allStacks(with_container_keys=False))
+    ]
+
+##  The pages to benchmark, as (name, function that returns the page generator).
+def benchmarkPages(registry):
+    global_stack, extruder_stacks = registry.activeStacks()
+    materials = registry.containersOfType("material")
+    stacks = registry.allStacks(with_container_keys=False)
+    fragment_dir = os.path.join(tempfile.gettempdir(), "god_mode_benchmark_files")
+    return [
+        ("htmlPage", lambda: htmlPage(global_stack, extruder_stacks)),
+        ("effectiveValuesHtmlPage", lambda: effectiveValuesHtmlPage(global_stack, extruder_stacks)),
+        ("containersOfTypeHtmlPage", lambda: containersOfTypeHtmlPage("Materials", materials)),
+        ("containersOfTypeHtmlPage (lazy)", lambda: containersOfTypeHtmlPage("Materials", materials, fragment_dir)),
+        ("allStacksHtmlPage", lambda: allStacksHtmlPage(stacks)),
+        ("compactHtmlPage", lambda: compactHtmlPage("Materials", materials))
+    ]
+
+##  Render a page like writeHtmlPage() does, but only count the bytes.
+#   \return Number of bytes of the page in UTF-8.
+def renderPage(page):
+    render_cache.clear()
+    output_bytes = 0
+    for chunk in page():
+        output_bytes += len(chunk.encode("utf-8"))
+    return output_bytes
+
+##  Time a stage and measure its peak memory.
+#   \param run Function that runs the stage once, and returns the number of bytes it made.
+def benchmarkStage(run, repeat):
+    wall_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output_bytes = run()
+        wall_times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"wall_time": min(wall_times), "peak_memory": peak_memory, "output_bytes": output_bytes}
+
+def compareWithBaseline(name, result, baseline):
+    baseline_result = baseline.get("results", {}).get(name)
+    if baseline_result is None:
+        return ""
+    changes = []
+    for field in ["wall_time", "peak_memory", "output_bytes"]:
+        if baseline_result.get(field):
+            changes.append("%+.1f%%" % (100.0 * (result[field] - baseline_result[field]) / baseline_result[field]))
+        else:
+            changes.append("-")
+    return "  vs baseline: " + " / ".join(changes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the God Mode report pages on a synthetic registry.")
+    parser.add_argument("--materials", type=int, default=200, help="Number of material containers.")
+    parser.add_argument("--keys", type=int, default=500, help="Number of setting keys.")
+    parser.add_argument("--properties", type=int, default=4, help="Number of properties per key in the definition.")
+    parser.add_argument("--machines", type=int, default=4, help="Number of printers.")
+    parser.add_argument("--extruders", type=int, default=2, help="Number of extruders per printer.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs per page.")
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare the results with this JSON file.")
+    args = parser.parse_args(argv)
+
+    sizes = {"materials": args.materials, "keys": args.keys, "properties": args.properties, "machines": args.machines, "extruders": args.extruders}
+    registry = SyntheticRegistry(**sizes)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fhandle:
+            baseline = json.load(fhandle)
+        if baseline.get("sizes") != sizes:
+            print("Warning: the baseline was made with other sizes: " + json.dumps(baseline.get("sizes")))
+
+    stages = [(name, lambda snapshot=snapshot: snapshot() and 0) for name, snapshot in benchmarkSnapshots(registry)]
+    stages += [(name, lambda page=page: renderPage(page)) for name, page in benchmarkPages(registry)]
+    results = {}
+    for name, run in stages:
+        result = benchmarkStage(run, args.repeat)
+        results[name] = result
+        print("%-32s %9.3f s %9.1f MB peak %9.1f MB output%s" % (name, result["wall_time"], result["peak_memory"] / 1e6, result["output_bytes"] / 1e6,
+                                                               compareWithBaseline(name, result, baseline)))
+
+    if args.save:
+        report = {
+            "sizes": sizes,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "results": results
+        }
+        with open(args.save, "w", encoding="utf-8") as fhandle:
+            json.dump(report, fhandle, indent=4, sort_keys=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+##  Stand-ins for the few Uranium classes that SnapshotBuilder uses, and containers and stacks that behave like the
+#   ones of Cura, so the benchmark can take snapshots without Cura.
+#
+#   installUraniumStandIns() must be called before anything imports GodMode.SnapshotBuilder.
+
+import sys
+import types
+
+# Properties that Cura adds to every setting definition, with their defaults.
+cura_property_defaults = {"limit_to_extruder": "-1", "settable_per_extruder": True}
+
+##  Register modules for UM.Settings.DefinitionContainer, UM.Settings.SettingDefinition and
+#   UM.Settings.SettingFunction with the classes of this module.
+#   \param prop_names The property names that SettingDefinition.getPropertyNames() returns.
+def installUraniumStandIns(prop_names):
+    SettingDefinition.prop_names = list(prop_names) + sorted(cura_property_defaults)
+    for name, attributes in [("UM", {}), ("UM.Settings", {}),
+                             ("UM.Settings.DefinitionContainer", {"DefinitionContainer": DefinitionContainer}),
+                             ("UM.Settings.SettingDefinition", {"SettingDefinition": SettingDefinition}),
+                             ("UM.Settings.SettingFunction", {"SettingFunction": SettingFunction})]:
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        module.__path__ = []
+        sys.modules[name] = module
+
+
+##  An expression of a setting, evaluated with the values of the keys it uses, like Uranium's SettingFunction.
+class SettingFunction:
+    def __init__(self, expression):
+        self._code = expression
+        self._compiled = compile(expression, "<setting function>", "eval")
+        self._used_keys = frozenset(name for name in self._compiled.co_names if name not in _function_names)
+
+    def __call__(self, value_provider, context=None):
+        values = {key: value_provider.getProperty(key, "value") for key in self._used_keys}
+        functions = {"max": max, "extruderValues": lambda key: [value_provider.getProperty(key, "value")]}
+        try:
+            return eval(self._compiled, functions, values)
+        except Exception:
+            return None
+
+    def getUsedSettingKeys(self):
+        return self._used_keys
+
+    def __repr__(self):
+        return "<UM.Settings.SettingFunction (0x{0:x}) ={1} >".format(id(self), self._code)
+
+_function_names = {"max", "extruderValues"}
+
+
+class SettingDefinition:
+    prop_names = []
+
+    def __init__(self, key, properties):
+        self.key = key
+        self._properties = properties
+
+    @staticmethod
+    def getPropertyNames():
+        return list(SettingDefinition.prop_names)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._properties.get(name, cura_property_defaults.get(name))
+
+
+class _SettingInstance:
+    def __init__(self, definition, value):
+        self.definition = definition
+        self.value = value
+
+
+class _Signal:
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback):
+        self._callbacks.append(callback)
+
+
+class _Container:
+    def __init__(self, container_id, type_):
+        self._id = container_id
+        self._metadata = {"type": type_, "id": container_id}
+        self.propertyChanged = _Signal()
+        self.metaDataChanged = _Signal()
+
+    def getId(self):
+        return self._id
+
+    def getName(self):
+        return self._id.replace("_", " ").title()
+
+    def isReadOnly(self):
+        return False
+
+    def getPath(self):
+        return "/usr/share/cura/resources/" + self._metadata["type"] + "/" + self._id + ".inst.cfg"
+
+    def getMetaData(self):
+        return self._metadata
+
+    def getMetaDataEntry(self, entry, default=None):
+        return self._metadata.get(entry, default)
+
+
+class DefinitionContainer(_Container):
+    ##  \param definitions List of SettingDefinitions.
+    def __init__(self, container_id, definitions):
+        super().__init__(container_id, "machine")
+        self._definitions = {definition.key: definition for definition in definitions}
+
+    def findDefinitions(self):
+        return list(self._definitions.values())
+
+    def getDefinition(self, key):
+        return self._definitions[key]
+
+    def getAllKeys(self):
+        return set(self._definitions)
+
+    def getProperty(self, key, prop_name, context=None):
+        definition = self._definitions.get(key)
+        if definition is None:
+            return None
+        value = getattr(definition, prop_name)
+        if value is None and prop_name == "value":
+            value = definition.default_value
+        return value
+
+
+class InstanceContainer(_Container):
+    ##  \param values Setting key -> value.
+    def __init__(self, container_id, type_, definition_container, values):
+        super().__init__(container_id, type_)
+        self._instances = {key: _SettingInstance(definition_container.getDefinition(key), value) for key, value in values.items()}
+        self._metadata.update({"setting_version": 22, "brand": "Generic"})
+
+    def findInstances(self):
+        return list(self._instances.values())
+
+    def getAllKeys(self):
+        return set(self._instances)
+
+    def getProperty(self, key, prop_name, context=None):
+        instance = self._instances.get(key)
+        return getattr(instance, prop_name, None) if instance is not None else None
+
+
+##  A stack that looks a property up in its containers, top to bottom, and evaluates setting functions with itself.
+#   Like Cura's ExtruderStack, an extruder stack takes the value of keys that can't be set per extruder from the
+#   global stack, its next stack.
+class ContainerStack(_Container):
+    def __init__(self, stack_id, type_, containers, next_stack=None):
+        super().__init__(stack_id, type_)
+        self._containers = containers
+        self._next_stack = next_stack
+        self._definition = containers[-1]
+        self.containersChanged = _Signal()
+
+    def getContainers(self):
+        return list(self._containers)
+
+    def getNextStack(self):
+        return self._next_stack
+
+    def getAllKeys(self):
+        return self._definition.getAllKeys()
+
+    def getProperty(self, key, prop_name, context=None):
+        if self._next_stack is not None and self._definition.getProperty(key, "settable_per_extruder") is False:
+            return self._next_stack.getProperty(key, prop_name)
+        for container in self._containers:
+            value = container.getProperty(key, prop_name)
+            if value is not None:
+                return value(self) if isinstance(value, SettingFunction) else value
+        if self._next_stack is not None:
+            return self._next_stack.getProperty(key, prop_name)
+        return None
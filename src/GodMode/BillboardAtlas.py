@@ -0,0 +1,224 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Mesh.MeshData import MeshData
+
+from UM.View.GL.OpenGL import OpenGL
+
+from UM.Resources import Resources  # To find shader locations
+
+try:
+    from PyQt6.QtGui import QImage, QPainter, QTextDocument
+    from PyQt6.QtCore import Qt, QRectF
+except:
+    from PyQt5.QtGui import QImage, QPainter, QTextDocument
+    from PyQt5.QtCore import Qt, QRectF
+
+from .ShelfPacker import ShelfPacker
+
+import hashlib
+import math
+
+import numpy
+
+PAGE_SIZE = 1024  # Width and height of the atlas textures, in pixels.
+MAX_LABEL_SIZE = 256  # Labels are cut off at this width and height, in pixels.
+PIXEL_SIZE = 50 / 256  # Size of a label pixel in the scene, in mm.
+
+# OpenGL constants for updating part of a texture, see _AtlasPage.upload().
+GL_TEXTURE_2D = 0x0DE1
+GL_RGBA = 0x1908
+GL_UNSIGNED_BYTE = 0x1401
+
+
+##  Packs the labels of all billboards into a few large textures, and draws all billboards on a texture with one mesh.
+#
+#   Billboards acquire the label they show, which is only rendered if no billboard shows the same text yet, and
+#   release it when they show something else. Every frame, the billboards add themselves with addBillboard(), and
+#   queueBillboards() then uploads the textures that changed and queues one mesh of camera facing quads per texture.
+#   Uranium binds textures per shader program, so every texture has a shader of its own.
+class BillboardAtlas:
+    def __init__(self):
+        self._pages = []
+        self._labels = {}  # Key -> _AtlasLabel
+        self._billboards = []  # (label, world position, sort) of the billboards of this frame.
+        self.texture_uploads = 0
+
+    ##  Get the label for a filled billboard template, rendering it into the atlas if it is not in there yet.
+    #   \return The key to add the billboard and to release the label with.
+    def acquire(self, html):
+        key = hashlib.blake2b(html.encode("utf-8"), digest_size = 16).digest()
+        label = self._labels.get(key)
+        if label is None:
+            label = self._renderLabel(html)
+            self._labels[key] = label
+        label.users += 1
+        return key
+
+    def release(self, key):
+        label = self._labels.get(key)
+        if label is None:
+            return
+        label.users -= 1
+        if label.users <= 0:
+            del self._labels[key]
+            label.page.packer.free(label.slot)
+
+    ##  Draw a label at a position in the scene, this frame.
+    #   \param sort Billboards with a lower sort value are drawn first.
+    def addBillboard(self, key, position, sort = 0):
+        label = self._labels.get(key)
+        if label is not None:
+            self._billboards.append((label, position, sort))
+
+    ##  Queue the billboards added this frame, one mesh per atlas texture. Must be called while the OpenGL context is
+    #   current, so from View.beginRendering().
+    #   \return The number of meshes that were queued.
+    def queueBillboards(self, renderer, scene):
+        billboards = self._billboards
+        self._billboards = []
+        camera_orientation = scene.getActiveCamera().getOrientation().toMatrix().getData()[:3, :3]
+        queued = 0
+
+        for page in self._pages:
+            if page.dirty:
+                page.upload()
+                self.texture_uploads += 1
+            page_billboards = [billboard for billboard in billboards if billboard[0].page is page]
+            if page_billboards:
+                renderer.queueNode(scene.getRoot(), shader = page.shader, transparent = True, mesh = page.batchMesh(page_billboards, camera_orientation),
+                                   sort = min(billboard[2] for billboard in page_billboards))
+                queued += 1
+        return queued
+
+    def _renderLabel(self, html):
+        document = QTextDocument()
+        document.setHtml(html)
+        size = document.size()
+        width = max(1, min(MAX_LABEL_SIZE, math.ceil(size.width())))
+        height = max(1, min(MAX_LABEL_SIZE, math.ceil(size.height())))
+
+        for page in self._pages:
+            slot = page.packer.allocate(width, height)
+            if slot is not None:
+                break
+        else:
+            page = _AtlasPage()
+            self._pages.append(page)
+            slot = page.packer.allocate(width, height)
+
+        page.draw(document, slot)
+        return _AtlasLabel(page, slot, width, height)
+
+class _AtlasLabel:
+    def __init__(self, page, slot, width, height):
+        self.page = page
+        self.slot = slot
+        self.users = 0
+        # Texture coordinates of the top left and bottom right corners, and the size of the quad in the scene.
+        self.uvs = (slot[0] / PAGE_SIZE, slot[1] / PAGE_SIZE, (slot[0] + width) / PAGE_SIZE, (slot[1] + height) / PAGE_SIZE)
+        self.size = (width * PIXEL_SIZE, height * PIXEL_SIZE)
+
+class _AtlasPage:
+    def __init__(self):
+        self.packer = ShelfPacker(PAGE_SIZE, PAGE_SIZE)
+        self.image = QImage(PAGE_SIZE, PAGE_SIZE, QImage.Format_ARGB32)
+        self.image.fill(Qt.transparent)
+        self.shader = None
+        self.texture = None
+        self.dirty = True
+        # Slots drawn since the last upload, as (x, y, width, height). Only these are uploaded once the texture exists.
+        self._dirty_slots = []
+        self._mesh = None
+        self._mesh_data = None
+
+    def draw(self, document, slot):
+        x, y, width, height = slot
+        painter = QPainter(self.image)
+        # Clear what a previous label left in the slot.
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(QRectF(x, y, width, height), Qt.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        painter.translate(x, y)
+        document.drawContents(painter, QRectF(0., 0., width, height))
+        painter.end()
+        self._dirty_slots.append(slot)
+        self.dirty = True
+
+    ##  Upload what changed in the page to its texture. The whole page is only uploaded while the texture doesn't exist
+    #   yet; after that only the slots that were drawn are, so a label that changes every frame doesn't upload the
+    #   whole page every frame.
+    def upload(self):
+        if self.shader is None:
+            # We now misuse the platform shader, as it actually supports textures
+            self.shader = OpenGL.getInstance().createShaderProgram(Resources.getPath(Resources.Shaders, "platform.shader"))
+            # Set the opacity to 0, so that the labels are in full control.
+            self.shader.setUniformValue("u_opacity", 0)
+            self.texture = OpenGL.getInstance().createTexture()
+            self.shader.setTexture(0, self.texture)
+
+        # The texture is created from the image the first time it is bound, which happens when it is drawn.
+        texture_id = self.texture.getTextureId()
+        if not texture_id or not self._uploadSlots(texture_id):
+            self.texture.setImage(self.image)
+        self._dirty_slots = []
+        self.dirty = False
+
+    ##  Replace the drawn slots in the texture, in the format Qt uploads images in.
+    #   \return False if this OpenGL binding can't update part of a texture.
+    def _uploadSlots(self, texture_id):
+        gl = OpenGL.getInstance().getBindingsObject()
+        try:
+            gl.glBindTexture(GL_TEXTURE_2D, texture_id)
+            for x, y, width, height in self._dirty_slots:
+                region = self.image.copy(x, y, width, height).convertToFormat(QImage.Format_RGBA8888)
+                bits = region.constBits()
+                bits.setsize(region.sizeInBytes())
+                gl.glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, width, height, GL_RGBA, GL_UNSIGNED_BYTE, numpy.frombuffer(bits, dtype = numpy.uint8))
+        except (AttributeError, TypeError):
+            return False
+        return True
+
+    ##  One mesh with a camera facing quad for every billboard, reused as long as the billboards and camera don't move.
+    def batchMesh(self, billboards, camera_orientation):
+        # Per billboard: position, texture coordinates and size.
+        data = numpy.array([tuple(position.getData()) + label.uvs + label.size for label, position, _ in billboards], dtype = numpy.float32)
+        data = numpy.concatenate((data.ravel(), camera_orientation.ravel().astype(numpy.float32)))
+        if self._mesh is not None and numpy.array_equal(data, self._mesh_data):
+            return self._mesh
+
+        count = len(billboards)
+        rotation = camera_orientation.astype(numpy.float32)
+        positions = data[:count * 9].reshape(count, 9)
+        # Blend the quads back to front. The camera looks along its negative z axis.
+        positions = positions[numpy.argsort(positions[:, :3] @ rotation[:, 2])]
+        u0, v0, u1, v1, width, height = positions[:, 3:].T
+        left = numpy.full(count, -25.0, dtype = numpy.float32)  # The top left corner stays where it was with 256x256 labels.
+        top = numpy.full(count, 25.0, dtype = numpy.float32)
+
+        # Corners per quad: bottom left, top left, bottom right, top right.
+        corners = numpy.stack([
+            numpy.stack([left, top - height], axis = 1),
+            numpy.stack([left, top], axis = 1),
+            numpy.stack([left + width, top - height], axis = 1),
+            numpy.stack([left + width, top], axis = 1)
+        ], axis = 1)  # (count, 4, 2)
+        local = numpy.concatenate([corners, numpy.zeros((count, 4, 1), dtype = numpy.float32)], axis = 2)
+        vertices = (local @ rotation.T + positions[:, numpy.newaxis, :3]).reshape(-1, 3)
+
+        uvs = numpy.stack([
+            numpy.stack([u0, v1], axis = 1),
+            numpy.stack([u0, v0], axis = 1),
+            numpy.stack([u1, v1], axis = 1),
+            numpy.stack([u1, v0], axis = 1)
+        ], axis = 1).reshape(-1, 2)
+
+        normal = rotation @ numpy.array([0, 0, -1], dtype = numpy.float32)
+        normals = numpy.tile(normal, (count * 4, 1))
+
+        first = numpy.arange(count, dtype = numpy.int32)[:, numpy.newaxis] * 4
+        indices = numpy.concatenate([first + [0, 1, 2], first + [3, 1, 2]], axis = 1).reshape(-1, 3)
+
+        self._mesh = MeshData(vertices = vertices, normals = normals, indices = indices, uvs = uvs)
+        self._mesh_data = data
+        return self._mesh
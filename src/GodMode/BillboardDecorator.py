@@ -16,6 +16,7 @@ class BillboardDecorator(SceneNodeDecorator):
 
     def clear(self):
         if self._billboard:
+            self._billboard.releaseLabel()
             self._billboard.setParent(None)
         self._billboard = None
 
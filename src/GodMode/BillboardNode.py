@@ -3,22 +3,11 @@
 
 from UM.Scene.SceneNode import SceneNode
 
-from UM.View.GL.OpenGL import OpenGL
+from .BillboardAtlas import BillboardAtlas
 
-from UM.Mesh.MeshBuilder import MeshBuilder  # To create the billboard quad
-
-from UM.Resources import Resources  # To find shader locations
-
-from UM.Math.Matrix import Matrix
-
-from UM.Application import Application
-
-try:
-    from PyQt6.QtGui import QImage, QPainter, QColor, QFont, QTextDocument
-    from PyQt6.QtCore import Qt, QRectF
-except:
-    from PyQt5.QtGui import QImage, QPainter, QColor, QFont, QTextDocument
-    from PyQt5.QtCore import Qt, QRectF
+# Shared by all billboards, so labels that don't change are only rendered once and all billboards are drawn together.
+# GodView queues the billboards of a frame with billboard_atlas.queueBillboards().
+billboard_atlas = BillboardAtlas()
 
 class BillboardNode(SceneNode):
     def __init__(self, node, parent=None):
@@ -26,37 +15,28 @@ class BillboardNode(SceneNode):
         self._target_node = node
         self.setCalculateBoundingBox(False)
 
-        self._billboard_mesh = self._createBillboardQuad(50)
-
-        self._shader = None
-        self._scene = Application.getInstance().getController().getScene()
+        self._label_key = None
+        self._label_changed = True
         self._template = ""
         self._display_data = {}
-        self._texture_width = 256
-        self._texture_height = 256
-
-    def _createBillboardQuad(self, size):
-        mb = MeshBuilder()
-        mb.addFaceByPoints(-size / 2, -size / 2, 0, -size / 2, size / 2, 0, size / 2, -size / 2, 0)
-        mb.addFaceByPoints(size / 2, size / 2, 0, -size / 2, size / 2, 0, size / 2, -size / 2, 0)
-
-        # Set UV coordinates so a texture can be created
-        mb.setVertexUVCoordinates(0, 0, 1)
-        mb.setVertexUVCoordinates(1, 0, 0)
-        mb.setVertexUVCoordinates(4, 0, 0)
-        mb.setVertexUVCoordinates(2, 1, 1)
-        mb.setVertexUVCoordinates(5, 1, 1)
-        mb.setVertexUVCoordinates(3, 1, 0)
-
-        return mb.build()
 
     def setTemplate(self, template):
-        self._template = template
-        self._shader = None  # Force update next render tick.
+        if template != self._template:
+            self._template = template
+            self._label_changed = True  # Update the label next render tick.
 
+    ##  Set the data to fill the template with. This is cheap if the data didn't change, so it can be done every frame.
     def setDisplayData(self, display_data):
-        self._display_data = display_data
-        self._shader = None  # Force update next render tick.
+        if display_data != self._display_data:
+            self._display_data = display_data
+            self._label_changed = True  # Update the label next render tick.
+
+    ##  Stop using the label, for instance because the billboard is removed.
+    def releaseLabel(self):
+        if self._label_key is not None:
+            billboard_atlas.release(self._label_key)
+        self._label_key = None
+        self._label_changed = True
 
     #   Convenience function to fill the billboard template with the data
     def _getFilledTemplate(self, display_data, template):
@@ -67,28 +47,15 @@ class BillboardNode(SceneNode):
         return filled_template
 
     def render(self, renderer):
-        if not self._shader:
-            # We now misuse the platform shader, as it actually supports textures
-            self._shader = OpenGL.getInstance().createShaderProgram(Resources.getPath(Resources.Shaders, "platform.shader"))
-            # Set the opacity to 0, so that the template is in full control.
-            self._shader.setUniformValue("u_opacity", 0)
-            self._texture = OpenGL.getInstance().createTexture()
-            document = QTextDocument()
-            document.setHtml(self._getFilledTemplate(self._display_data, self._template))
-
-            texture_image = QImage(self._texture_width, self._texture_height, QImage.Format_ARGB32)
-            texture_image.fill(Qt.transparent)
-            painter = QPainter(texture_image)
-            document.drawContents(painter, QRectF(0., 0., self._texture_width, self._texture_height))
-            painter.end()
-            self._texture.setImage(texture_image)
-            self._shader.setTexture(0, self._texture)
-
-        node_position = self._target_node.getWorldPosition()
-        position_matrix = Matrix()
-        position_matrix.setByTranslation(node_position)
-        camera_orientation = self._scene.getActiveCamera().getOrientation().toMatrix()
-
-        renderer.queueNode(self._scene.getRoot(), shader=self._shader, transparent=True, mesh=self._billboard_mesh.getTransformed(position_matrix.multiply(camera_orientation)), sort=self._target_node.getDepth())
+        if self._label_changed:
+            self._label_changed = False
+            filled_template = self._getFilledTemplate(self._display_data, self._template)
+            # Acquire the new label before releasing the old one, so an unchanged label is not rendered again.
+            label_key = billboard_atlas.acquire(filled_template)
+            if self._label_key is not None:
+                billboard_atlas.release(self._label_key)
+            self._label_key = label_key
+
+        billboard_atlas.addBillboard(self._label_key, self._target_node.getWorldPosition(), sort=self._target_node.getDepth())
 
         return True  # This node does it's own rendering.
@@ -0,0 +1,70 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import functools
+import itertools
+import weakref
+
+# Signals of containers and stacks that are emitted when their contents change.
+change_signal_names = ["propertyChanged", "metaDataChanged", "nameChanged", "containersChanged"]
+
+
+##  Hands out change tokens for containers and stacks.
+#
+#   A token stays the same for as long as the container doesn't change, so it can be used as a cache key. The
+#   tracker connects to the change signals of every container it is asked about. Containers without change
+#   signals get no token (None) and must not be cached.
+#
+#   Stack values can depend on any other container through setting functions, so every stack token changes
+#   whenever any tracked container or stack changes.
+class ChangeTracker:
+    def __init__(self):
+        # Tokens are never reused, even if a container is deleted and a new one gets the same id().
+        self._counter = itertools.count()
+        self._generations = {}
+        # Keeps the weak reference and the signal callbacks of every tracked container alive.
+        self._watches = {}
+        self._global_generation = next(self._counter)
+
+    def containerToken(self, container):
+        key = id(container)
+        if key not in self._generations and not self._watch(container):
+            return None
+        return ("container", key, self._generations[key])
+
+    def stackToken(self, stack):
+        if self.containerToken(stack) is None:
+            return None
+        next_stack = stack.getNextStack() if hasattr(stack, "getNextStack") else None
+        containers = stack.getContainers() + (next_stack.getContainers() if next_stack is not None else [])
+        if any(self.containerToken(container) is None for container in containers):
+            return None
+        return ("stack", id(stack), self._global_generation)
+
+    def _watch(self, container):
+        key = id(container)
+        try:
+            reference = weakref.ref(container, functools.partial(self._forget, key))
+        except TypeError:
+            return False
+
+        signals = [getattr(container, name) for name in change_signal_names if hasattr(container, name)]
+        if not signals:
+            return False
+
+        # Signals only keep weak references to their slots.
+        callback = functools.partial(self._onChanged, key)
+        for signal in signals:
+            signal.connect(callback)
+        self._watches[key] = (reference, callback)
+        self._generations[key] = next(self._counter)
+        return True
+
+    def _onChanged(self, key, *args):
+        self._generations[key] = next(self._counter)
+        self._global_generation = next(self._counter)
+
+    def _forget(self, key, reference):
+        self._generations.pop(key, None)
+        self._watches.pop(key, None)
+        self._global_generation = next(self._counter)
@@ -0,0 +1,250 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import html
+import json
+
+encode = html.escape
+
+##  A report that contains its data as one compact JSON document instead of HTML tables.
+#
+#   Every string in the data is stored once in a string table and referred to by index, property names are
+#   stored in a table of their own, and containers that are shared by several stacks are stored once. A small
+#   script in the page turns the data into rows, and only puts the rows that are scrolled into view in the DOM.
+#
+#   The data layout is:
+#     containers: [[anchor, id, metadata, keys, children], ...] where
+#       metadata: [[key, text, css class], ...] (all string indices)
+#       keys: [key, property count, property index, value, property index, value, ..., key, ...] (flat)
+#       children: indices of the containers of a stack, or null
+#     roots: indices of the containers and stacks shown at the top level
+#     props: property names
+#     strings: all other strings
+def compactHtmlPage(title, snapshots):
+    yield "<!DOCTYPE html><html>\n<head>\n<meta charset='UTF-8'>\n<title>" + encode(title) + "</title>\n"
+    yield "<style>" + compact_css + "</style>\n"
+    yield "<script>" + compact_js + "</script>\n"
+    yield "</head>\n<body onload='initCompactReport();'>\n"
+    yield "<div class='menu'><ul id='menu'></ul>\n"
+    yield "<div class='key_filter'>&#x1f511; filter regex: <input type='text' id='key_filter' /></div></div>\n"
+    yield "<div class='contents' id='viewport'><div id='canvas'></div></div>\n"
+
+    strings = StringTable()
+    prop_names = StringTable()
+    indices = {}
+    roots = []
+
+    yield "<script type='application/json' id='report_data'>{\"title\":" + jsonText(title) + ",\"containers\":["
+    for snapshot in snapshots:
+        for container in (snapshot.containers or []) + [snapshot]:
+            if container.anchor in indices:
+                continue
+            record = compactContainer(container, strings, prop_names, indices)
+            yield ("," if indices else "") + jsonText(record)
+            indices[container.anchor] = len(indices)
+        roots.append(indices[snapshot.anchor])
+    yield "],\"roots\":" + jsonText(roots) + ",\"props\":" + jsonText(prop_names.strings) + ",\"strings\":" + jsonText(strings.strings) + "}</script>\n"
+
+    yield "</body>\n</html>\n"
+
+def compactContainer(container, strings, prop_names, indices):
+    intern = strings.intern
+    metadata = [[intern(key), intern(text), intern(clazz.strip())] for key, text, clazz in container.metadata_rows]
+    keys = []
+    for key, prop_values in container.settings.items():
+        keys.append(intern(key))
+        keys.append(len(prop_values))
+        for prop_name, prop_value in prop_values.items():
+            keys.append(prop_names.intern(prop_name))
+            keys.append(intern(prop_value))
+    children = [indices[child.anchor] for child in container.containers] if container.isStack() else None
+    return [intern(container.anchor), intern(container.container_id), metadata, keys, children]
+
+##  JSON without whitespace, that is safe to put inside a <script> element.
+def jsonText(value):
+    return json.dumps(value, separators=(",", ":")).replace("</", "<\\/")
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self._indices = {}
+
+    def intern(self, string):
+        index = self._indices.get(string)
+        if index is None:
+            index = len(self.strings)
+            self._indices[string] = index
+            self.strings.append(string)
+        return index
+
+compact_css = """
+html { font-family: sans-serif; font-size: 11pt; }
+body { margin: 0; }
+a, a:visited { color: #0000ff; text-decoration: none; cursor: pointer; }
+ul { padding-left: 1em; }
+div.menu { position: fixed; padding: 4px; left: 0px; width: 25em; top: 0px; height: 100%; box-sizing: border-box; overflow: auto; }
+div.contents { position: fixed; left: 25em; right: 0px; top: 0px; bottom: 0px; overflow: auto; }
+#canvas { position: relative; }
+div.row { position: absolute; left: 0px; right: 8px; box-sizing: border-box; padding: 4px; line-height: 18px; overflow: hidden; }
+div.row > span { display: inline-block; vertical-align: top; white-space: pre; overflow: hidden; }
+div.row span.key { width: 25em; font-weight: bold; }
+div.header { background-color: #428bca; color: #ffffff; font-weight: bold; border-radius: 4px 4px 0px 0px; }
+div.header.stack { background-color: #18294D; }
+div.odd { background-color: #e0e0e0; }
+div.exception { background-color: #e08080; }
+span.prop_name { font-weight: bold; }
+"""
+
+compact_js = """
+var LINE_HEIGHT = 18;
+var ROW_PADDING = 8;
+var OVERSCAN = 600;
+
+var reportData = null;
+var rows = [];
+var offsets = [];
+var rootRows = [];
+
+function initCompactReport() {
+  reportData = JSON.parse(document.getElementById('report_data').textContent);
+  var strings = reportData.strings;
+  var menu = [];
+  var i;
+  for (i=0; i<reportData.roots.length; i++) {
+    var container = reportData.containers[reportData.roots[i]];
+    menu.push("<li><a onclick='scrollToRoot(" + i + ");'>" + escapeHtml(strings[container[1]]) + "</a></li>");
+  }
+  document.getElementById('menu').innerHTML = menu.join('');
+
+  var filter = document.getElementById('key_filter');
+  filter.addEventListener('change', function() {
+    var filterRegexp = null;
+    if (filter.value !== "") {
+      try {
+        filterRegexp = new RegExp(filter.value, 'i');
+      } catch (e) {
+        return;  // Keep the rows of the last valid filter.
+      }
+    }
+    buildRows(filterRegexp);
+    renderRows();
+  });
+  document.getElementById('viewport').addEventListener('scroll', function() {
+    window.requestAnimationFrame(renderRows);
+  });
+  buildRows(null);
+  renderRows();
+}
+
+function escapeHtml(text) {
+  return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+}
+
+// Rows are only described here; renderRows() creates the elements for the rows that are in view.
+function buildRows(filterRegexp) {
+  rows = [];
+  rootRows = [];
+  var i, j;
+  for (i=0; i<reportData.roots.length; i++) {
+    var root = reportData.roots[i];
+    rootRows.push(rows.length);
+    var children = reportData.containers[root][4];
+    addContainerRows(root, children !== null, filterRegexp);
+    if (children !== null) {
+      for (j=0; j<children.length; j++) {
+        addContainerRows(children[j], false, filterRegexp);
+      }
+    }
+  }
+
+  offsets = new Array(rows.length + 1);
+  var offset = 0;
+  for (i=0; i<rows.length; i++) {
+    offsets[i] = offset;
+    offset += rows[i].lines * LINE_HEIGHT + ROW_PADDING;
+  }
+  offsets[rows.length] = offset;
+  document.getElementById('canvas').style.height = offset + 'px';
+}
+
+function addContainerRows(index, isStack, filterRegexp) {
+  var strings = reportData.strings;
+  var container = reportData.containers[index];
+  rows.push({type: 'header', container: index, stack: isStack, lines: 1});
+  var i;
+  if (filterRegexp === null) {
+    var metadata = container[2];
+    for (i=0; i<metadata.length; i++) {
+      rows.push({type: 'metadata', entry: metadata[i], lines: strings[metadata[i][1]].split('\\n').length});
+    }
+  }
+  var keys = container[3];
+  i = 0;
+  while (i < keys.length) {
+    var count = keys[i + 1];
+    if (filterRegexp === null || filterRegexp.test(strings[keys[i]])) {
+      rows.push({type: 'key', keys: keys, start: i, lines: Math.max(count, 1)});
+    }
+    i += 2 + 2 * count;
+  }
+}
+
+function rowHtml(index) {
+  var strings = reportData.strings;
+  var row = rows[index];
+  var style = " style='top:" + offsets[index] + "px;height:" + (offsets[index + 1] - offsets[index]) + "px;'";
+  var clazz = index % 2 ? 'row odd' : 'row';
+  if (row.type === 'header') {
+    var container = reportData.containers[row.container];
+    var title = (row.stack ? 'Container Stack: ' : 'Container: ') + strings[container[1]];
+    return "<div class='row header" + (row.stack ? " stack" : "") + "'" + style + ">" + escapeHtml(title) + "</div>";
+  }
+  if (row.type === 'metadata') {
+    var entry = row.entry;
+    return "<div class='" + clazz + " " + strings[entry[2]] + "'" + style + "><span class='key'>" + escapeHtml(strings[entry[0]]) +
+      "</span><span>" + escapeHtml(strings[entry[1]]) + "</span></div>";
+  }
+  var keys = row.keys;
+  var count = keys[row.start + 1];
+  var values = [];
+  var i;
+  for (i=0; i<count; i++) {
+    var prop = keys[row.start + 2 + 2 * i];
+    var value = keys[row.start + 3 + 2 * i];
+    values.push("<span class='prop_name'>" + escapeHtml(reportData.props[prop]) + ":</span> " + escapeHtml(strings[value]));
+  }
+  return "<div class='" + clazz + "'" + style + "><span class='key'>&#x1f511; " + escapeHtml(strings[keys[row.start]]) +
+    "</span><span>" + values.join('\\n') + "</span></div>";
+}
+
+function firstRowBelow(offset) {
+  var low = 0;
+  var high = rows.length;
+  while (low < high) {
+    var middle = (low + high) >> 1;
+    if (offsets[middle + 1] <= offset) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+}
+
+function renderRows() {
+  var viewport = document.getElementById('viewport');
+  var top = viewport.scrollTop - OVERSCAN;
+  var bottom = viewport.scrollTop + viewport.clientHeight + OVERSCAN;
+  var parts = [];
+  var i;
+  for (i=firstRowBelow(top); i<rows.length && offsets[i] < bottom; i++) {
+    parts.push(rowHtml(i));
+  }
+  document.getElementById('canvas').innerHTML = parts.join('');
+}
+
+function scrollToRoot(index) {
+  document.getElementById('viewport').scrollTop = offsets[rootRows[index]];
+  renderRows();
+}
+"""
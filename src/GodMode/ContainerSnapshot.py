@@ -0,0 +1,28 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+
+##  Plain data copy of a container or container stack.
+#
+#   Snapshots only hold strings, so a report can be rendered from them on a worker thread while Cura keeps using
+#   (and changing) the live containers.
+class ContainerSnapshot:
+    def __init__(self, anchor, container_id, metadata_rows, settings, containers=None, token=None):
+        # Unique id of the live container, used for the links in the report.
+        self.anchor = anchor
+        self.container_id = container_id
+        # List of (key, text, css class) tuples.
+        self.metadata_rows = metadata_rows
+        # Setting key -> {property name: repr of the property value}, both sorted.
+        self.settings = settings
+        # Snapshots of the containers in a stack, top to bottom. None if this is not a stack.
+        self.containers = containers
+        # Change token from the ChangeTracker, None if the container can't be cached.
+        self.token = token
+        # For stacks: setting key -> list of facet names for the key filter, see SnapshotBuilder._stackFacets().
+        self.facets = None
+        # The "type" metadata entry, or the class name if the container has none.
+        self.container_type = None
+
+    def isStack(self):
+        return self.containers is not None
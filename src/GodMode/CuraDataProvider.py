@@ -0,0 +1,59 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+from UM.Application import Application
+from UM.Settings.ContainerRegistry import ContainerRegistry
+
+from .DataProvider import DataProvider
+from .SnapshotBuilder import SnapshotBuilder
+from .SnapshotFile import DEFINITION, INSTANCE, STACK
+
+
+##  Provides snapshots of the containers in the running Cura. Must be used on the main thread.
+class CuraDataProvider(DataProvider):
+    def __init__(self, change_tracker=None):
+        self._change_tracker = change_tracker
+
+    def activeStacks(self, with_container_keys=True):
+        builder = SnapshotBuilder(self._change_tracker)
+        stacks = [builder.snapshotStack(stack, with_container_keys=with_container_keys) for stack in getActiveStacks()]
+        return (stacks[0], stacks[1:]) if stacks else (None, [])
+
+    def containersOfType(self, type_):
+        builder = SnapshotBuilder(self._change_tracker)
+        return [builder.snapshotContainer(container) for container in findContainersOfType(type_)]
+
+    def allStacks(self, with_container_keys=True):
+        builder = SnapshotBuilder(self._change_tracker)
+        return [builder.snapshotStack(stack, with_container_keys=with_container_keys) for stack in findAllStacks()]
+
+    ##  Snapshots of every definition, instance container and stack, for saveSnapshotFile().
+    #   \return Tuple of a list of (kind, snapshot) tuples and the anchors of the active stacks.
+    def registrySnapshots(self):
+        builder = SnapshotBuilder(self._change_tracker)
+        snapshots = [(DEFINITION, builder.snapshotContainer(container)) for container in findContainersOfType("machine")]
+        instances = ContainerRegistry.getInstance().findInstanceContainers()
+        instances.sort(key=lambda x: x.getId())
+        snapshots += [(INSTANCE, builder.snapshotContainer(container)) for container in instances]
+        snapshots += [(STACK, builder.snapshotStack(stack)) for stack in findAllStacks()]
+        return snapshots, [str(id(stack)) for stack in getActiveStacks()]
+
+def findContainersOfType(type_):
+    if type_ == "machine":
+        containers = ContainerRegistry.getInstance().findDefinitionContainers()
+    else:
+        containers = ContainerRegistry.getInstance().findInstanceContainers(type=type_)
+    containers.sort(key=lambda x: x.getId())
+    return containers
+
+def findAllStacks():
+    stacks = ContainerRegistry.getInstance().findContainerStacks()
+    stacks.sort(key=lambda x: x.getId())
+    return stacks
+
+##  The global stack followed by the extruder stacks of the active printer, or an empty list if there is none.
+def getActiveStacks():
+    global_stack = Application.getInstance().getGlobalContainerStack()
+    if global_stack is None:
+        return []
+    machine = Application.getInstance().getMachineManager().activeMachine
+    return [global_stack] + list(machine.extruderList)
@@ -0,0 +1,67 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+from .SnapshotFile import SnapshotFile, DEFINITION, INSTANCE, STACK
+
+
+##  Where the report pages get their snapshots from.
+#
+#   The pages in ReportFormat only ever see ContainerSnapshots, so they can be rendered from the running Cura
+#   (CuraDataProvider) as well as from a saved snapshot file, without Cura (SnapshotFileDataProvider).
+class DataProvider:
+    ##  \param with_container_keys Whether the snapshots of the containers in the stacks get their settings, or only
+    #   their id and metadata. The stack snapshots themselves always have all their keys.
+    #   \return Tuple of the snapshot of the global stack and a list of snapshots of the extruder stacks.
+    def activeStacks(self, with_container_keys=True):
+        raise NotImplementedError()
+
+    ##  \param type_ Type of instance container, or "machine" for all definition containers.
+    #   \return List of container snapshots, sorted by id.
+    def containersOfType(self, type_):
+        raise NotImplementedError()
+
+    ##  \param with_container_keys See activeStacks().
+    #   \return List of stack snapshots, sorted by id.
+    def allStacks(self, with_container_keys=True):
+        raise NotImplementedError()
+
+
+##  Provides the snapshots in a snapshot file (see SnapshotFile).
+class SnapshotFileDataProvider(DataProvider):
+    def __init__(self, path):
+        self._file = SnapshotFile(path)
+        self.info = self._file.info
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    ##  Whether the file knows which stacks were active when it was saved.
+    def hasActiveStacks(self):
+        return bool(self.info.get("active_stacks"))
+
+    ##  The snapshot of one container or stack, by anchor.
+    def snapshot(self, anchor):
+        return self._file.load(anchor)
+
+    def activeStacks(self, with_container_keys=True):
+        stacks = [self._file.load(anchor, with_container_keys) for anchor in self.info.get("active_stacks", [])]
+        return (stacks[0], stacks[1:]) if stacks else (None, [])
+
+    ##  The instance container types in the file.
+    def containerTypes(self):
+        return sorted({self._file.containerType(anchor) for anchor in self._file.anchors(INSTANCE)})
+
+    def containersOfType(self, type_):
+        if type_ == "machine":
+            anchors = self._file.anchors(DEFINITION)
+        else:
+            anchors = [anchor for anchor in self._file.anchors(INSTANCE) if self._file.containerType(anchor) == type_]
+        return sorted((self._file.load(anchor) for anchor in anchors), key=lambda x: x.container_id)
+
+    def allStacks(self, with_container_keys=True):
+        return sorted((self._file.load(anchor, with_container_keys) for anchor in self._file.anchors(STACK)), key=lambda x: x.container_id)
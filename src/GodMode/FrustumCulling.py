@@ -0,0 +1,29 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+# Which corners of a box take the maximum instead of the minimum, per axis.
+_BOX_CORNERS = numpy.array([[x, y, z] for x in (False, True) for y in (False, True) for z in (False, True)])
+
+##  Test a batch of axis aligned boxes against the view frustum of a camera.
+#
+#   A box is culled when all its corners are outside the same clipping plane, which is done in clip space, for all
+#   boxes at once. Boxes that are near a corner of the frustum can be kept while they are not visible, but no visible
+#   box is ever culled.
+#   \param view_projection (4, 4) array, the projection matrix times the view matrix of the camera.
+#   \param minimum (N, 3) array of the minimum corners of the boxes, in world coordinates.
+#   \param maximum (N, 3) array of the maximum corners.
+#   \return (N,) boolean array, True for the boxes that can be visible.
+def boxesInFrustum(view_projection, minimum, maximum):
+    corners = numpy.where(_BOX_CORNERS, maximum[:, numpy.newaxis, :], minimum[:, numpy.newaxis, :])  # (N, 8, 3)
+    clip = corners @ view_projection[:3, :3].T + view_projection[:3, 3]  # x, y and z of the corners in clip space.
+    w = corners @ view_projection[3, :3] + view_projection[3, 3]
+    outside = (numpy.all(clip < -w[..., numpy.newaxis], axis = 1) | numpy.all(clip > w[..., numpy.newaxis], axis = 1)).any(axis = 1)
+    return ~outside
+
+##  Distance of a batch of points to a position.
+#   \param points (N, 3) array.
+#   \param position Array of 3 values.
+def distancesTo(points, position):
+    return numpy.sqrt(numpy.square(points - position).sum(axis = 1))
@@ -1,10 +1,12 @@
 # Copyright (c) 2016 Ultimaker B.V.
 # Cura is released under the terms of the AGPLv3 or higher.
-from UM.Settings.DefinitionContainer import DefinitionContainer
-from UM.Settings.SettingDefinition import SettingDefinition
 from UM.Extension import Extension
+from UM.Job import Job
+from UM.Logger import Logger
+from UM.Resources import Resources
 from UM.Application import Application
-from UM.Settings.ContainerRegistry import ContainerRegistry
+from UM.Message import Message
+from UM.Scene.Iterator.DepthFirstIterator import DepthFirstIterator
 
 try:
     from PyQt6.QtCore import QObject, QUrl
@@ -13,463 +15,448 @@ except:
     from PyQt5.QtCore import QObject, QUrl
     from PyQt5.QtGui import QDesktopServices
 
+from .ChangeTracker import ChangeTracker
+from .CompactReport import compactHtmlPage
+from .CuraDataProvider import CuraDataProvider, getActiveStacks
+from .DataProvider import SnapshotFileDataProvider
+from .LiveReportServer import LiveReportServer
+from .Instrumentation import beginInstrumentation, currentInstrumentation, endInstrumentation
+from .KeyIndex import KeyIndex
+from .ReportFormat import htmlPage, containersOfTypeHtmlPage, allStacksHtmlPage, stackDiffHtmlPage, effectiveValuesHtmlPage, getHtmlHeader, htmlFooter, \
+    formatSettingsKeyTableRow, formatSettingValue, liveReportJS
+from .ReportJob import ReportJob
+from . import CompactReport
+from . import GodView
+from . import SceneMeshReport
+from . import ReportFormat
+from .BillboardNode import BillboardNode
+from .SceneMeshReport import sceneMeshesHtmlPage
+from .SceneNodeSnapshot import SceneNodeSnapshot
+from .SettingDependencyReport import settingDependenciesHtmlPage
+from .ContainerSnapshot import ContainerSnapshot
+from .SnapshotBuilder import SnapshotBuilder, keySettings, setting_prop_names, stack_prop_names
+from .SnapshotFile import saveSnapshotFile
+
+import glob
 import os.path
 import tempfile
-import html
-import json
-
-encode = html.escape
+import time
+
+# Shared by all reports, so snapshots of containers that didn't change since the last report can be recognised.
+change_tracker = ChangeTracker()
+data_provider = CuraDataProvider(change_tracker)
+# Target -> the last ReportJob that was started for it, see startReportJob().
+report_jobs = {}
+
+# Set with the "Toggle Report Timings" and "Toggle Report Profiling" menu items, see instrumentedReport().
+report_timings = False
+report_profiling = False
+# Set with the "Toggle Compressed Reports" menu item, see ReportWriter.writeHtmlPage().
+compress_reports = False
+
+# The functions that are counted and timed when a report is instrumented, as (owner, name, stage).
+instrumented_functions = [
+    (SnapshotBuilder, "snapshotContainer", "snapshot container"),
+    (SnapshotBuilder, "snapshotStack", "snapshot stack"),
+    (SnapshotBuilder, "_rawProperties", "read container properties"),
+    (SnapshotBuilder, "_stackProperties", "resolve stack properties"),
+    (SnapshotBuilder, "_getProperty", "getProperty"),
+    (SnapshotBuilder, "settingDependencyGraph", "setting dependency graph"),
+    (ReportFormat, "formatContainer", "formatContainer"),
+    (ReportFormat, "renderContainer", "renderContainer (not cached)"),
+    (ReportFormat, "formatContainerKeys", "formatContainerKeys"),
+    (ReportFormat, "formatSettingValue", "formatSettingValue"),
+    (ReportFormat, "formatKeyValueTableRow", "formatKeyValueTableRow"),
+    (ReportFormat, "formatSettingsKeyTableRow", "formatSettingsKeyTableRow"),
+    (ReportFormat, "formatJsonValue", "json.dumps"),
+    (ReportFormat, "encode", "encode"),
+    (ReportFormat, "writeScriptCall", "write fragment"),
+    (CompactReport, "compactContainer", "compactContainer"),
+    (SceneMeshReport, "meshStatistics", "mesh statistics"),
+    (SceneMeshReport, "bufferStatistics", "mesh buffer statistics"),
+    (KeyIndex, "addRows", "key index"),
+    (KeyIndex, "toJson", "key index json")
+]
 
 class GodMode(Extension, QObject):
     def __init__(self, parent = None):
         QObject.__init__(self, parent)
         Extension.__init__(self)
 
-        self.addMenuItem("View Active Stack", viewAll)
-        self.addMenuItem("View All Machines", viewAllMachines)
-        self.addMenuItem("View All Materials", viewAllMaterials)
-        self.addMenuItem("View All Qualities", viewAllQualities)
-        self.addMenuItem("View All Quality Changes", viewAllQualityChanges)
-        self.addMenuItem("View All User Containers", viewAllUserContainers)
-        self.addMenuItem("View All Variants", viewAllVariants)
-        self.addMenuItem("View All Stacks", viewAllStacks)
+        self.addMenuItem("View Active Stack", instrumentedReport(viewAll))
+        self.addMenuItem("View All Machines", instrumentedReport(viewAllMachines))
+        self.addMenuItem("View All Materials", instrumentedReport(viewAllMaterials))
+        self.addMenuItem("View All Qualities", instrumentedReport(viewAllQualities))
+        self.addMenuItem("View All Quality Changes", instrumentedReport(viewAllQualityChanges))
+        self.addMenuItem("View All User Containers", instrumentedReport(viewAllUserContainers))
+        self.addMenuItem("View All Variants", instrumentedReport(viewAllVariants))
+        self.addMenuItem("View All Stacks", instrumentedReport(viewAllStacks))
+        self.addMenuItem("View Active Stack (Compact)", instrumentedReport(viewAllCompact))
+        self.addMenuItem("View All Materials (Compact)", instrumentedReport(viewAllMaterialsCompact))
+        self.addMenuItem("View All Stacks (Compact)", instrumentedReport(viewAllStacksCompact))
+        self.addMenuItem("View Effective Values", instrumentedReport(viewEffectiveValues))
+        self.addMenuItem("View Scene Meshes", instrumentedReport(viewSceneMeshes))
+        self.addMenuItem("View Setting Dependencies", instrumentedReport(viewSettingDependencies))
+        self.addMenuItem("Save Stack Diff Baseline", saveDiffBaseline)
+        self.addMenuItem("Diff Stacks With Baseline", instrumentedReport(diffStacksWithBaseline))
+        self.addMenuItem("Save Registry Snapshot", saveRegistrySnapshot)
+        self.addMenuItem("Diff Stacks With Last Snapshot", instrumentedReport(diffStacksWithLastSnapshot))
+        self.addMenuItem("Open Live Report", openLiveReport)
+        self.addMenuItem("Stop Live Report", stopLiveReport)
+        self.addMenuItem("Toggle Report Timings", toggleReportTimings)
+        self.addMenuItem("Toggle Report Profiling", toggleReportProfiling)
+        self.addMenuItem("Toggle GodView Statistics", toggleGodViewStatistics)
+        self.addMenuItem("Toggle Compressed Reports", toggleCompressedReports)
+
+# The report menu callbacks return their ReportJob, or None if they don't make a report.
+def instrumentedReport(callback):
+    def instrumentedCallback():
+        if not report_timings and not report_profiling:
+            return callback()
+        instrumentation = beginInstrumentation(instrumented_functions, profile=report_profiling)
+        if instrumentation is None:
+            Logger.log("w", "Another report is being instrumented, not instrumenting this one.")
+            return callback()
+        try:
+            with instrumentation.measure("collect snapshots (main thread)"), instrumentation.profiling():
+                job = callback()
+        except:
+            endInstrumentation(instrumentation)
+            raise
+        if job is None:
+            endInstrumentation(instrumentation)
+        return job
+    return instrumentedCallback
+
+def toggleReportTimings():
+    global report_timings
+    report_timings = not report_timings
+    Message("Report timings are " + ("on" if report_timings else "off") + ".", title="God Mode").show()
+
+def toggleReportProfiling():
+    global report_profiling
+    report_profiling = not report_profiling
+    Message("Report profiling is " + ("on" if report_profiling else "off") + ". Profiling makes reports a lot slower.", title="God Mode").show()
+
+def toggleGodViewStatistics():
+    GodView.show_statistics = not GodView.show_statistics
+    Message("GodView statistics are " + ("on" if GodView.show_statistics else "off") + ".", title="God Mode").show()
+
+def toggleCompressedReports():
+    global compress_reports
+    compress_reports = not compress_reports
+    Message("Reports are " + ("stored gzip compressed" if compress_reports else "not compressed") + ".", title="God Mode").show()
+
+# The menu callbacks below copy what they need from the registry into snapshots on the main thread. Rendering and
+# writing the page then happens in a ReportJob, so Cura stays responsive while a large page is written.
 
 def viewAll():
-    openHtmlPage("cura_settings.html", htmlPage())
+    global_stack, extruder_stacks = data_provider.activeStacks()
+    return startReportJob("cura_settings.html", htmlPage(global_stack, extruder_stacks), "Active Stack")
 
 def viewAllMaterials():
-    openHtmlPage("cura_materials.html", containersOfTypeHtmlPage("Materials", "material"))
+    return viewContainersOfType("cura_materials.html", "Materials", "material")
 
 def viewAllUserContainers():
-    openHtmlPage("cura_user_containers.html", containersOfTypeHtmlPage("User Containers", "user"))
+    return viewContainersOfType("cura_user_containers.html", "User Containers", "user")
 
 def viewAllVariants():
-    openHtmlPage("cura_variants.html", containersOfTypeHtmlPage("Variants", "variant"))
+    return viewContainersOfType("cura_variants.html", "Variants", "variant")
 
 def viewAllQualities():
-    openHtmlPage("cura_qualities.html", containersOfTypeHtmlPage("Quality", "quality"))
+    return viewContainersOfType("cura_qualities.html", "Quality", "quality")
 
 def viewAllQualityChanges():
-    openHtmlPage("cura_quality_changes.html", containersOfTypeHtmlPage("Quality Changes", "quality_changes"))
+    return viewContainersOfType("cura_quality_changes.html", "Quality Changes", "quality_changes")
 
 def viewAllMachines():
-    openHtmlPage("cura_machines.html", containersOfTypeHtmlPage("Machines", "machine"))
+    return viewContainersOfType("cura_machines.html", "Machines", "machine")
 
 def viewAllStacks():
-    openHtmlPage("cura_stacks.html", allStacksHtmlPage());
-
-def openHtmlPage(page_name, html_contents):
-    target = os.path.join(tempfile.gettempdir(), page_name)
-    with open(target, "w", encoding="utf-8") as fhandle:
-        fhandle.write(html_contents)
-    QDesktopServices.openUrl(QUrl.fromLocalFile(target))
-
-def getHtmlHeader(page_name="Cura Settings"):
-    return """<!DOCTYPE html><html>
-<head>
-<meta charset="UTF-8">
-<title>""" + encode(page_name) + """</title>
-<script>
-""" + keyFilterJS() + """
-</script>
-<style>
-html {
-  font-family: sans-serif;
-  font-size: 11pt;
-}
-
-a, a:visited {
-  color: #0000ff;
-  text-decoration: none;
-}
-
-ul {
-  padding-left: 1em;
-}
-
-div.menu {
-  position: fixed;
-  padding: 4px;
-  left: 0px;
-  width: 25em;
-  top: 0px;
-  height: 100%;
-  box-sizing: border-box;
-  overflow: auto;
-}
-
-div.contents {
-  padding-left: 25em;
-}
-
-table.key_value_table {
-  border-collapse: separate;
-  border: 1px solid #e0e0e0;
-  margin-top: 16px;
-  border-top-left-radius: 5px;
-  border-top-right-radius: 5px;
-  border-bottom-left-radius: 4px;
-  border-bottom-right-radius: 4px;
-  border-spacing: 0px;
-}
-
-table.key_value_table th, table.key_value_table td {
-  padding: 4px;
-}
-
-table.key_value_table > thead th {
-  width: 65em;
-  text-align: left;
-  background-color: #428bca;
-  color: #ffffff;
-  border-top-left-radius: 4px;
-  border-top-right-radius: 4px;
-}
-
-table.key_value_table > tbody > tr:nth-child(even) {
-  background-color: #e0e0e0;
-}
-
-table.key_value_table > tbody > tr.exception {
-  background-color: #e08080;
-}
-table.key_value_table td.key {
-  width: 25em;
-  font-weight: bold;
-  font-weight: bold;
-}
-
-table.key_value_table tr.preformat td.value {
-  white-space: pre;
-}
-
-div.container_stack {
-  padding: 8px;
-  border: 2px solid black;
-  border-radius: 8px;
-}
-
-div.container_stack > table.key_value_table > thead th {
-  background-color: #18294D;
-}
-
-div.container_stack_containers {
-  margin: 4px;
-  padding: 4px;
-  border: 1px dotted black;
-  border-radius: 4px;
-}
-
-tr.key_hide {
-  display: none;
-}
-
-body.hide_metadata tr.metadata {
-  display: none;
-}
-
-ul.property_list {
-  list-style: none;
-  padding-left: 0;
-  margin-left: 0;
-}
-
-span.prop_name {
-  font-weight: bold;
-}
-</style>
-</head>
-<body onload='initKeyFilter();'>
-"""
-
-def htmlPage():
-    html = getHtmlHeader()
-
-    html += "<div class='menu'>\n"
-    html += "<ul>"
-    html += "<li><a href='#global_stack'>Global Stack</a>"
-    html += formatContainerStackMenu(Application.getInstance().getGlobalContainerStack())
-    html += "</li>\n"
-
-    html += "<li><a href='#extruder_stacks'>Extruder Stacks</a>\n"
-    html += formatExtruderStacksMenu()
-    html += "</li>\n"
-
-    html += "</ul>\n"
-    html += keyFilterWidget()
-    html += "</div>"
-
-    html += "<div class='contents'>"
-    html += "<h2 id='global_stack'>Global Stack</h2>"
-    html += formatContainerStack(Application.getInstance().getGlobalContainerStack())
-
-    html += formatExtruderStacks()
-
-    html += "</div>"
-
-    html += htmlFooter
-    return html
-
-def containersOfTypeHtmlPage(name, type_):
-    html = getHtmlHeader(name)
-
-    html += "<div class='menu'>\n"
-    html += "<ul>"
-    if type_ == "machine":
-        containers = ContainerRegistry.getInstance().findDefinitionContainers()
-    else:
-        containers = ContainerRegistry.getInstance().findInstanceContainers(type=type_)
-    containers.sort(key=lambda x: x.getId())
-    for container in containers:
-        html += "<li><a href='#"+ str(id(container)) + "'>"+encode(container.getId())+"</a></li>\n"
-    html += "</ul>"
-
-    html += keyFilterWidget()
-    html += "</div>"
-
-    html += "<div class='contents'>"
-    html += formatAllContainersOfType(name, type_)
-    html += "</div>"
-
-    html += htmlFooter
-    return html
-
-def allStacksHtmlPage():
-    html = getHtmlHeader("All Stacks")
-
-    html += "<div class='menu'>\n"
-    html += "<ul>"
-    stacks = ContainerRegistry.getInstance().findContainerStacks()
-    stacks.sort(key=lambda x: x.getId())
-    for container in stacks:
-        html += "<li><a href='#"+ str(id(container)) + "'>"+encode(container.getId())+"</a></li>\n"
-    html += "</ul>"
-    html += keyFilterWidget()
-    html += "</div>"
-
-    html += "<div class='contents'>"
-    for stack in stacks:
-        html += formatContainerStack(stack, show_stack_keys=False)
-    html += "</div>"
-
-    html += htmlFooter
-    return html
-
-def formatExtruderStacks():
-    html = ""
-    html += "<h2 id='extruder_stacks'>Extruder Stacks</h2>"
-    machine = Application.getInstance().getMachineManager().activeMachine
-    for position, extruder_stack in sorted([(int(p + 1), es) for p, es in enumerate(machine.extruderList)]):
-        position = str(position)
-        html += "<h3 id='extruder_index_" + position + "'>Index " + position + "</h3>"
-        html += formatContainerStack(extruder_stack)
-    return html
-
-def formatExtruderStacksMenu():
-    html = ""
-    html += "<ul>"
-    machine = Application.getInstance().getMachineManager().activeMachine
-    for position, extruder_stack in sorted([(int(p + 1), es) for p, es in enumerate(machine.extruderList)]):
-        html += "<li>"
-        html += "<a href='#extruder_index_" + str(position) + "'>Index " + str(position) + "</a>\n"
-        html += formatContainerStackMenu(extruder_stack)
-        html += "</li>"
-    html += "</ul>"
-    return html
-
-def formatAllContainersOfType(name, type_):
-    html = "<h2>" + name + "</h2>\n"
-
-    if type_ == "machine":
-        containers = ContainerRegistry.getInstance().findDefinitionContainers()
-    else:
-        containers = ContainerRegistry.getInstance().findInstanceContainers(type=type_)
-
-    containers.sort(key=lambda x: x.getId())
-    for container in containers:
-        html += formatContainer(container)
-    return html
-
-def formatContainerStack(stack, show_stack_keys=True):
-    html = "<div class='container_stack'>\n"
-    html += formatContainer(stack, name="Container Stack", short_value_properties=True)
-    html += "<div class='container_stack_containers'>\n"
-    html += "<h3>Containers</h3>\n"
-    for container in stack.getContainers():
-        html += formatContainer(container, show_keys=show_stack_keys)
-    html += "</div>\n"
-    html += "</div>\n"
-    return html
-
-def formatContainerStackMenu(stack):
-    html = ""
-    html += "<a href='#" + str(id(stack)) + "'></a><br />\n"
-    html += "<ul>\n"
-    for container in stack.getContainers():
-        html += "<li><a href='#" + str(id(container)) + "'>" + encode(container.getId()) + "</a></li>"
-    html += "</ul>\n"
-    return html
-
-def formatContainerMetaDataOnly(container):
-    html = tableHeader("Container: " + safeCall(container.getId))
-    html += formatContainerMetaDataRows(container)
-    html += tableFooter()
-    return html
-
-def formatContainer(container, name="Container", short_value_properties=False, show_keys=True):
-    html = ""
-    html += "<a id='" + str(id(container)) + "' ></a>"
-    html += tableHeader(name + ": " + safeCall(container.getId))
-    html += formatContainerMetaDataRows(container)
-
-    if show_keys:
-        key_properties = ["value", "resolve"] if short_value_properties else setting_prop_names
-        key_properties.sort()
-
-        if hasattr(container, "getAllKeys"):
-            keys = list(container.getAllKeys())
-            keys.sort()
-            for key in keys:
-                html += formatSettingsKeyTableRow(key, formatSettingValue(container, key, key_properties))
-
-    html += tableFooter()
-    return html
-
-def formatContainerMetaDataRows(def_container):
-    html = ""
-    try:
-        html += formatKeyValueTableRow("<type>", type(def_container), extra_class="metadata")
-        html += formatKeyValueTableRow("<id>", def_container, extra_class="metadata")
-        html += formatKeyValueTableRow("id", safeCall(def_container.getId), extra_class="metadata")
-        html += formatKeyValueTableRow("name", safeCall(def_container.getName), extra_class="metadata")
-        if hasattr(def_container, "_getDefinition"):
-            html += formatKeyValueTableRow("definition", safeCall(def_container._getDefinition), extra_class="metadata")
-        html += formatKeyValueTableRow("read only", safeCall(def_container.isReadOnly), extra_class="metadata")
-        html += formatKeyValueTableRow("path", safeCall(def_container.getPath), extra_class="metadata")
-        html += formatKeyValueTableRow("metadata", safeCall(def_container.getMetaData), extra_class="metadata")
-    except:
-        pass
-
-    return html
-
-setting_prop_names = SettingDefinition.getPropertyNames()
-def formatSettingValue(container, key, properties=None):
-    if properties is None:
-        properties = setting_prop_names
-
-    value = "<ul class=\"property_list\">\n"
-    comma = ""
-    properties.sort()
-    for prop_name in properties:
-        prop_value = container.getProperty(key, prop_name)
-        if prop_value is not None:
-            value += "  <li>\n"
-            value += "    <span class='prop_name'>" + encode(prop_name) + ":</span> " + encode(repr(prop_value))
-            value += "  </li>\n"
-    value += "</ul>\n"
-
-    return RawHtml(value)
-
-def safeCall(callable):
-    try:
-        result = callable()
-        return result
-    except Exception as ex:
-        return ex
-
-def tableHeader(title):
-    return """<table class="key_value_table">
-    <thead><tr><th colspan="2">""" + encode(title) + """</th></tr></thead>
-    <tbody>
-"""
-
-def tableFooter():
-    return "</tbody></table>"
-
-def formatKeyValueTableRow(key, value, extra_class=""):
-    clazz = ""
-    if isinstance(value, Exception):
-        clazz = "exception"
-
-    if isinstance(value, RawHtml):
-        formatted_value = value.value
-    elif isinstance(value, dict):
-        formatted_value = encode(json.dumps(value, sort_keys=True, indent=4))
-        clazz += " preformat"
-    elif isinstance(value, DefinitionContainer):
-        formatted_value = encode(value.getId() + " " + str(value))
-    else:
-        formatted_value = encode(str(value))
-
-    if isinstance(key, RawHtml):
-        formatted_key = key.value
-    else:
-        formatted_key = encode(str(key))
-
-    return "<tr class='" + extra_class + " " + clazz + "'><td class='key'>" + formatted_key + "</td><td class='value'>" + formatted_value + "</td></tr>\n"
-
-def formatSettingsKeyTableRow(key, value):
-    clazz = ""
-    if isinstance(value, Exception):
-        clazz = "exception"
-
-    if isinstance(value, RawHtml):
-        formatted_value = value.value
-    else:
-        formatted_value = encode(str(value))
-
-    formatted_key = encode(str(key))
-    return "<tr class='" + clazz + "' --data-key='" + formatted_key + "'><td class='key'>&#x1f511; " + formatted_key + "</td><td class='value'>" + formatted_value + "</td></tr>\n"
-
-def keyFilterJS():
-    return """
-    function initKeyFilter() {
-      var filter = document.getElementById('key_filter');
-      filter.addEventListener('change', function() {
-        var filterValue = filter.value;
-
-        if (filterValue === "") {
-          document.body.classList.add('show_metadata');
-          document.body.classList.remove('hide_metadata');
-        } else {
-          document.body.classList.remove('show_metadata');
-          document.body.classList.add('hide_metadata');
-        }
-
-        var filterRegexp = new RegExp(filterValue, 'i');
-
-        var allKeys = document.querySelectorAll('[--data-key]');
-        var i;
-        for (i=0; i<allKeys.length; i++) {
-          var keyTr = allKeys[i];
-          var key = keyTr.getAttribute('--data-key');
-          if (filterRegexp.test(key)) {
-            keyTr.classList.remove('key_hide');
-          } else {
-            keyTr.classList.add('key_hide');
-          }
-        }
-      });
+    stacks = data_provider.allStacks(with_container_keys=False)
+    return startReportJob("cura_stacks.html", allStacksHtmlPage(stacks), "All Stacks")
+
+def viewContainersOfType(page_name, name, type_):
+    containers = data_provider.containersOfType(type_)
+    # These pages can hold hundreds of containers, so their keys are only loaded when a container is shown.
+    fragment_dir = os.path.join(tempfile.gettempdir(), os.path.splitext(page_name)[0] + "_files")
+    return startReportJob(page_name, containersOfTypeHtmlPage(name, containers, fragment_dir), name)
+
+def viewAllCompact():
+    global_stack, extruder_stacks = data_provider.activeStacks()
+    return startReportJob("cura_settings_compact.html", compactHtmlPage("Cura Settings", [global_stack] + extruder_stacks), "Active Stack")
+
+def viewAllMaterialsCompact():
+    containers = data_provider.containersOfType("material")
+    return startReportJob("cura_materials_compact.html", compactHtmlPage("Materials", containers), "Materials")
+
+def viewAllStacksCompact():
+    stacks = data_provider.allStacks(with_container_keys=False)
+    return startReportJob("cura_stacks_compact.html", compactHtmlPage("All Stacks", stacks), "All Stacks")
+
+def viewEffectiveValues():
+    global_stack, extruder_stacks = data_provider.activeStacks(with_container_keys=False)
+    if global_stack is None:
+        Message("There is no active printer.", title="God Mode").show()
+        return
+    return startReportJob("cura_effective_values.html", effectiveValuesHtmlPage(global_stack, extruder_stacks), "Effective Values")
+
+def viewSceneMeshes():
+    nodes = snapshotSceneNodes()
+    return startReportJob("cura_scene_meshes.html", sceneMeshesHtmlPage(nodes), "Scene Meshes")
+
+##  Snapshots of all nodes in the scene, except for the billboards of GodView. The buffers of the meshes are looked at
+#   by the report job.
+def snapshotSceneNodes():
+    root = Application.getInstance().getController().getScene().getRoot()
+    snapshots = []
+    for node in DepthFirstIterator(root):
+        if isinstance(node, BillboardNode):
+            continue
+        parent = node.getParent()
+        mesh_data = node.getMeshData()
+        snapshots.append(SceneNodeSnapshot(
+            "node_" + str(id(node)),
+            node.getName(),
+            node.getDepth(),
+            bool(node.callDecoration("isGroup")),
+            "node_" + str(id(parent)) if parent is not None else None,
+            id(mesh_data) if mesh_data is not None else None,
+            meshBuffers(mesh_data) if mesh_data is not None else None
+        ))
+    return snapshots
+
+##  The numpy arrays of a MeshData, by name.
+def meshBuffers(mesh_data):
+    buffers = {
+        "vertices": mesh_data.getVertices(),
+        "normals": mesh_data.getNormals(),
+        "indices": mesh_data.getIndices(),
+        "colors": mesh_data.getColors(),
+        "uvs": mesh_data.getUVCoordinates()
     }
-    """
-
-def keyFilterWidget():
-    html = """
-    <div class='key_filter'>
-    &#x1f511; filter regex: <input type='text' id='key_filter' />
-    </div>
-    """
-    return html
-
-# def formatContainerInstance(container_instance):
-#     return """
+    for name in mesh_data.attributeNames():
+        buffers[name] = mesh_data.getAttribute(name)["value"]
+    return {name: array for name, array in buffers.items() if array is not None}
+
+##  Which settings the setting functions of the active stacks use and how long they take to evaluate. The graph is
+#   also exported as JSON and DOT, next to the page.
+def viewSettingDependencies():
+    stacks = getActiveStacks()
+    if not stacks:
+        Message("There is no active printer.", title="God Mode").show()
+        return
+    graph = SnapshotBuilder(change_tracker).settingDependencyGraph(stacks)
+    export_path = os.path.join(tempfile.gettempdir(), "cura_setting_dependencies")
+    return startReportJob("cura_setting_dependencies.html", settingDependenciesHtmlPage(graph, export_path), "Setting Dependencies")
+
+# Snapshots of the active stacks, saved by saveDiffBaseline().
+diff_baseline = []
+
+def snapshotActiveStacks():
+    global_stack, extruder_stacks = data_provider.activeStacks(with_container_keys=False)
+    if global_stack is None:
+        return []
+    return [global_stack] + extruder_stacks
+
+def saveDiffBaseline():
+    diff_baseline[:] = snapshotActiveStacks()
+    Message("Saved the active stacks. Use 'Diff Stacks With Baseline' to see what changed since.", title="God Mode").show()
+
+def diffStacksWithBaseline():
+    if not diff_baseline:
+        saveDiffBaseline()
+        return
+    return diffStacks(list(zip(diff_baseline, snapshotActiveStacks())))
+
+##  Open a report with the differences between pairs of stacks.
+#   \param stack_pairs List of (left, right) tuples. Stacks can be live stacks or stack snapshots.
+def diffStacks(stack_pairs, page_name="cura_stack_diff.html"):
+    builder = SnapshotBuilder(change_tracker)
+    snapshot_pairs = []
+    for left, right in stack_pairs:
+        if not isinstance(left, ContainerSnapshot):
+            left = builder.snapshotStack(left, with_container_keys=False)
+        if not isinstance(right, ContainerSnapshot):
+            right = builder.snapshotStack(right, with_container_keys=False)
+        snapshot_pairs.append((left, right))
+    return startReportJob(page_name, stackDiffHtmlPage(snapshot_pairs), "Stack Differences")
+
+def getSnapshotDirectory():
+    return os.path.join(Resources.getDataStoragePath(), "god_mode_snapshots")
+
+##  Save the whole registry, with the resolved values of all stacks, to a snapshot file (see SnapshotFile).
 #
-# """
-
-
-htmlFooter = """</body>
-</html>
-"""
-class RawHtml:
-    def __init__(self, value):
-        self.value = value
+#   The file can also be rendered without Cura, see RenderReports.
+def saveRegistrySnapshot():
+    snapshots, active_stacks = data_provider.registrySnapshots()
+
+    application = Application.getInstance()
+    global_stack = application.getGlobalContainerStack()
+    info = {
+        "machine": global_stack.getName() if global_stack is not None else "",
+        "application_version": application.getVersion(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "active_stacks": active_stacks
+    }
+    file_name = time.strftime("%Y%m%d-%H%M%S") + ".godsnap"
+    os.makedirs(getSnapshotDirectory(), exist_ok=True)
+    SaveSnapshotJob(os.path.join(getSnapshotDirectory(), file_name), snapshots, info).start()
+
+def diffStacksWithLastSnapshot():
+    snapshot_files = sorted(glob.glob(os.path.join(getSnapshotDirectory(), "*.godsnap")))
+    if not snapshot_files:
+        Message("There are no saved snapshots yet. Use 'Save Registry Snapshot' first.", title="God Mode").show()
+        return
+
+    current_stacks = snapshotActiveStacks()
+    with SnapshotFileDataProvider(snapshot_files[-1]) as snapshot_provider:
+        saved_stacks = {stack.container_id: stack for stack in snapshot_provider.allStacks()}
+    return diffStacks([(saved_stacks[stack.container_id], stack) for stack in current_stacks if stack.container_id in saved_stacks])
+
+class SaveSnapshotJob(Job):
+    def __init__(self, path, snapshots, info):
+        super().__init__()
+        self._path = path
+        self._snapshots = snapshots
+        self._info = info
+
+    def run(self):
+        try:
+            saveSnapshotFile(self._path, self._snapshots, self._info)
+        except Exception:
+            Logger.logException("e", "Failed to save snapshot %s", self._path)
+            return
+        Logger.log("i", "Saved registry snapshot to %s", self._path)
+        self.setResult(self._path)
+        message = Message("Saved registry snapshot to " + self._path, title="God Mode")
+        Application.getInstance().callLater(message.show)
+
+def openLiveReport():
+    live_report.open()
+
+def stopLiveReport():
+    live_report.stop()
+
+##  Render and write the page on a worker thread, then open it in the browser.
+#
+#   A page is written by one job at a time: while a job is still writing the page, another request for it is ignored.
+def startReportJob(page_name, html_chunks, title):
+    target = os.path.join(tempfile.gettempdir(), page_name)
+    running_job = report_jobs.get(target)
+    if running_job is not None and not running_job.isFinished():
+        Message(page_name + " is still being written. Wait for it, or cancel it to write it again.", title=title).show()
+        return None
+    job = ReportJob(target, html_chunks, title, currentInstrumentation(), compress_reports)
+    report_jobs[target] = job
+    job.start()
+    return job
+
+##  The active stack report, served by a LiveReportServer and updated while it is open.
+#
+#   When a setting changes, only the rows of that key are formatted again and pushed to the page. Changes to the
+#   structure of the stacks (other containers, other printer) make the page reload instead.
+class LiveReport:
+    def __init__(self):
+        self._server = LiveReportServer(self._renderPage)
+        self._snapshots = []
+        # (live container, snapshot) of every table in the page.
+        self._watched = []
+        self._connected_stacks = []
+        self._changed_keys = set()
+        self._structure_changed = False
+        self._flush_pending = False
+
+    def open(self):
+        if not self._server.isRunning():
+            Application.getInstance().globalContainerStackChanged.connect(self._onStructureChanged)
+            self._takeSnapshot()
+        QDesktopServices.openUrl(QUrl(self._server.start()))
+
+    def stop(self):
+        if not self._server.isRunning():
+            return
+        Application.getInstance().globalContainerStackChanged.disconnect(self._onStructureChanged)
+        self._disconnectStacks()
+        self._server.stop()
+        self._snapshots = []
+        self._watched = []
+
+    def _takeSnapshot(self):
+        self._disconnectStacks()
+        stacks = getActiveStacks()
+
+        builder = SnapshotBuilder(change_tracker)
+        snapshots = [builder.snapshotStack(stack) for stack in stacks]
+        watched = {}
+        for stack, snapshot in zip(stacks, snapshots):
+            watched[snapshot.anchor] = (stack, snapshot)
+            for container, container_snapshot in zip(stack.getContainers(), snapshot.containers):
+                watched[container_snapshot.anchor] = (container, container_snapshot)
+            stack.propertyChanged.connect(self._onPropertyChanged)
+            stack.containersChanged.connect(self._onStructureChanged)
+        self._connected_stacks = stacks
+        self._watched = list(watched.values())
+        self._snapshots = snapshots
+
+    def _disconnectStacks(self):
+        for stack in self._connected_stacks:
+            stack.propertyChanged.disconnect(self._onPropertyChanged)
+            stack.containersChanged.disconnect(self._onStructureChanged)
+        self._connected_stacks = []
+
+    # Runs on a server thread, so it may only use the snapshots.
+    def _renderPage(self):
+        snapshots = self._snapshots
+        if not snapshots:
+            return iter([getHtmlHeader(), "<p>There is no active printer.</p>", htmlFooter])
+        return htmlPage(snapshots[0], snapshots[1:], extra_html="<script>" + liveReportJS() + "</script>\n")
+
+    def _onPropertyChanged(self, key, property_name, *args):
+        self._changed_keys.add(key)
+        self._scheduleFlush()
+
+    def _onStructureChanged(self, *args):
+        self._structure_changed = True
+        self._scheduleFlush()
+
+    # Changes often come in bursts, for instance when a profile is changed, so they are sent in one go.
+    def _scheduleFlush(self):
+        if not self._flush_pending:
+            self._flush_pending = True
+            Application.getInstance().callLater(self._flushChanges)
+
+    def _flushChanges(self):
+        self._flush_pending = False
+        keys = sorted(self._changed_keys)
+        self._changed_keys = set()
+        if not self._server.isRunning():
+            return
+
+        rows = []
+        for container, snapshot in self._watched:
+            properties = stack_prop_names if snapshot.isStack() else setting_prop_names
+            settings = None
+            for key in keys:
+                values = keySettings(container, key, properties)
+                if key not in snapshot.settings:
+                    if values:
+                        self._structure_changed = True  # A new row, which needs a new page.
+                    continue
+                if values != snapshot.settings[key]:
+                    if settings is None:
+                        settings = dict(snapshot.settings)  # The server may be rendering the old one.
+                    settings[key] = values
+                    rows.append({"anchor": snapshot.anchor, "key": key, "html": formatSettingsKeyTableRow(key, formatSettingValue(values))})
+            if settings is not None:
+                snapshot.settings = settings
+                snapshot.token = None
+
+        if self._structure_changed:
+            self._structure_changed = False
+            self._takeSnapshot()
+            self._server.publish("reload", {})
+        elif rows:
+            self._server.publish("rows", rows)
+
+live_report = LiveReport()
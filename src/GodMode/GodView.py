@@ -9,12 +9,24 @@ from UM.View.GL.OpenGL import OpenGL
 from UM.View.Renderer import Renderer
 from UM.View.View import View
 from .BillboardDecorator import BillboardDecorator
+from .BillboardNode import BillboardNode, billboard_atlas
+from .MatrixTextFormatter import MatrixTextFormatter
+from .RenderStatistics import RenderStatistics
+from . import FrustumCulling
 from UM.Event import Event
-
-import re
+from UM.Scene.Camera import Camera
 
 import numpy
 
+# How much of a node GodView draws.
+LOD_OUT_OF_VIEW = 0
+LOD_MESH_ONLY = 1
+LOD_NAME = 2
+LOD_FULL = 3
+
+# Whether GodView shows what it draws per frame and how long that takes. Toggled from the God Mode menu.
+show_statistics = False
+
 
 ##  The godview shows debug information about the scene and it's nodes.
 class GodView(View):
@@ -25,12 +37,29 @@ class GodView(View):
     axis_width = 0.5
     axis_height = 20
 
+    # Up to this distance from the camera nodes get a full billboard, then one with just their name, up to
+    # name_billboard_distance. Further away only their mesh is drawn.
+    full_billboard_distance = 1000
+    name_billboard_distance = 3000
+
+    statistics_distance = 400  # Distance of the statistics billboard in front of the camera.
+
     def __init__(self):
         super().__init__()
         self._shader = None
+        self._axis_mesh = None
+        self._bounding_box_meshes = {}  # Node -> _BoundingBoxMesh
+        self._matrix_formatter = MatrixTextFormatter()
+        self._statistics = RenderStatistics()
+        self._statistics_label_key = None
+        self._scene = None
+        self._clearDecoratedNodes()
         self._billboard_template = "<html><H2>{name}</H2> <b><p>{matrix}</p>Depth: {depth} <br>Parent Name: {parent_name}<br>Has mesh:{has_mesh}</b></html>"
+        self._name_billboard_template = "<html><H2>{name}</H2></html>"
 
     def beginRendering(self):
+        self._statistics.beginFrame()
+
         # Convenience setup
         scene = self.getController().getScene()
         renderer = self.getRenderer()
@@ -39,58 +68,198 @@ class GodView(View):
             self._shader = OpenGL.getInstance().createShaderProgram(Resources.getPath(Resources.Shaders, "color.shader"))
             self._shader.setUniformValue("u_color", Color(32, 32, 32, 170))
 
-        for node in DepthFirstIterator(scene.getRoot()):
-            if not node.render(renderer):
-                # For now we only render nodes that indicate that they need rendering.
-                if node.getMeshData():
-                    # Render origin of this node.
-                    renderer.queueNode(scene.getRoot(), mesh = self._getAxisMesh(node), transparent = True)
-
-                    # Render transparent MeshData
-                    renderer.queueNode(node, shader = self._shader, transparent = True)
-
-                    billboard_node = self._ensureNodeHasBillboard(node)
-
-                    # Update the displayed data on the billboard.
-                    data = self._matrixToHtml(node.getLocalTransformation())
-                    billboard_node.setDisplayData({"name": node.getName(), "matrix": data, "depth": node.getDepth(), "parent_name": node.getParent().getName(), "has_mesh": "True"})
-
-                # Handle group nodes
-                if node.callDecoration("isGroup"):
-                    # Render origin of this node.
-                    renderer.queueNode(scene.getRoot(), mesh=self._getAxisMesh(node), transparent = True)
-                    # Render bounding box of this node
-                    renderer.queueNode(scene.getRoot(), mesh=node.getBoundingBoxMesh(), mode=Renderer.RenderLines)
-
-                    billboard_node = self._ensureNodeHasBillboard(node)
-
-                    # Update the displayed data on the billboard.
-                    data = self._matrixToHtml(node.getLocalTransformation())
-                    billboard_node.setDisplayData({"name": node.getName(), "matrix": data, "depth": node.getDepth(), "parent_name": node.getParent().getName(), "has_mesh": node.getMeshData() is not None})
-
-                # We sometimes have nodes that are not groups, but have children. Also draw them
-                elif not node.getMeshData() and len(node.getChildren()) != 0:
-                    # Render origin of this node.
-                    renderer.queueNode(scene.getRoot(), mesh=self._getAxisMesh(node), transparent = True)
-
-                    billboard_node = self._ensureNodeHasBillboard(node)
-
-                    # Update the displayed data on the billboard.
-                    data = self._matrixToHtml(node.getLocalTransformation())
-                    parent_name = node.getParent().getName() if node.getParent() else ""
-                    billboard_node.setDisplayData({"name": node.getName(), "matrix": data, "depth": node.getDepth(), "parent_name": parent_name, "has_mesh": "False"})
-                    bounding_box = node.getBoundingBox()
-                    if bounding_box:
-                        mesh_builder = MeshBuilder()
-                        mesh_builder.addCube(
-                            width=bounding_box.width,
-                            height=bounding_box.height,
-                            depth=bounding_box.depth,
-                            center=bounding_box.center,
-                            color=Color(0.0, 0.0, 1.0, 1.0)
-                        )
-                        mesh = mesh_builder.build()
-                        renderer.queueNode(scene.getRoot(), mesh=mesh, mode=Renderer.RenderLines)
+        decorated_nodes = self._getDecoratedNodes(scene)
+        levels = self._levelsOfDetail(scene.getActiveCamera(), decorated_nodes)
+        self._statistics.decorated_nodes = len(decorated_nodes)
+
+        # Every node gets to draw itself, also nodes that are not decorated, like tool handles.
+        self_rendering_nodes = {node for node in self._scene_nodes if node.render(renderer)}
+
+        labels = {}  # Node -> (billboard node, display data)
+        for decorated, level in zip(decorated_nodes, levels):
+            node = decorated.node
+            if node in self_rendering_nodes:
+                continue  # This node does its own rendering.
+            if level == LOD_OUT_OF_VIEW:
+                continue
+            self._statistics.drawn_nodes += 1
+
+            if level != LOD_MESH_ONLY:
+                # Render origin of this node.
+                renderer.queueNode(node, mesh = self._getAxisMesh(), transparent = True)
+                self._statistics.queued_nodes += 1
+
+            if decorated.has_mesh:
+                # Render transparent MeshData
+                renderer.queueNode(node, shader = self._shader, transparent = True)
+                self._statistics.addMesh(decorated.vertex_count, decorated.triangle_count)
+
+            if level == LOD_MESH_ONLY:
+                continue  # Too far away to make out the rest.
+
+            # Handle group nodes
+            if decorated.is_group:
+                # Render bounding box of this node
+                renderer.queueNode(scene.getRoot(), mesh=node.getBoundingBoxMesh(), mode=Renderer.RenderLines)
+                self._statistics.queued_nodes += 1
+                has_mesh = decorated.has_mesh
+            elif decorated.has_mesh:
+                has_mesh = "True"
+            # We sometimes have nodes that are not groups, but have children. Also draw them
+            else:
+                has_mesh = "False"
+                bounding_box_mesh = self._getBoundingBoxMesh(node)
+                if bounding_box_mesh:
+                    renderer.queueNode(scene.getRoot(), mesh=bounding_box_mesh, mode=Renderer.RenderLines)
+                    self._statistics.queued_nodes += 1
+
+            if decorated.billboard_node is None:
+                decorated.billboard_node = self._ensureNodeHasBillboard(node)
+            if level == LOD_NAME:
+                decorated.billboard_node.setTemplate(self._name_billboard_template)
+                decorated.billboard_node.setDisplayData({"name": node.getName()})
+                decorated.billboard_node.render(renderer)
+                continue
+
+            # The data to display on the billboard, the matrix is filled in below.
+            decorated.billboard_node.setTemplate(self._billboard_template)
+            parent_name = decorated.parent.getName() if decorated.parent else ""
+            labels[node] = (decorated.billboard_node, {"name": node.getName(), "depth": decorated.depth, "parent_name": parent_name, "has_mesh": has_mesh})
+
+        # Format the matrices of all billboards at once, only the ones that changed are formatted again.
+        matrices = self._matrix_formatter.format(list(labels), [node.getLocalTransformation().getData() for node in labels])
+        for (billboard_node, display_data), matrix in zip(labels.values(), matrices):
+            display_data["matrix"] = matrix
+            billboard_node.setDisplayData(display_data)
+            billboard_node.render(renderer)
+
+        if show_statistics:
+            self._addStatisticsBillboard(scene.getActiveCamera())
+        elif self._statistics_label_key is not None:
+            billboard_atlas.release(self._statistics_label_key)
+            self._statistics_label_key = None
+
+        # The billboard nodes added themselves to the atlas when they were rendered.
+        texture_uploads = billboard_atlas.texture_uploads
+        self._statistics.queued_nodes += billboard_atlas.queueBillboards(renderer, scene)
+        self._statistics.texture_uploads = billboard_atlas.texture_uploads - texture_uploads
+
+        self._statistics.endQueue()
+
+    ##  Show the statistics of the previous frame in the top left corner of the view, with a billboard that moves
+    #   along with the camera.
+    def _addStatisticsBillboard(self, camera):
+        label_key = billboard_atlas.acquire(self._statistics.html())
+        if self._statistics_label_key is not None:
+            billboard_atlas.release(self._statistics_label_key)
+        self._statistics_label_key = label_key
+
+        # Find the top left corner of the view at statistics_distance in front of the camera, in camera coordinates.
+        inverse_projection = numpy.linalg.inv(camera.getProjectionMatrix().getData())
+        near, far = (inverse_projection @ numpy.array([-0.95, 0.95, depth, 1.0]) for depth in (-1.0, 1.0))
+        near = near[:3] / near[3]
+        far = far[:3] / far[3]
+        along = numpy.clip((-self.statistics_distance - near[2]) / (far[2] - near[2]), 0.0, 1.0)
+        corner = near + (far - near) * along
+        # The top left corner of a billboard is 25 mm left of and above its position.
+        corner += [25, -25, 0]
+
+        position = camera.getWorldTransformation().getData() @ numpy.append(corner, 1.0)
+        billboard_atlas.addBillboard(label_key, Vector(*position[:3]), sort = 1000)
+
+    ##  The nodes that get an axis and a billboard, in depth first order. The scene is only walked again when its
+    #   structure changed: nodes were added or removed, or got or lost their mesh.
+    def _getDecoratedNodes(self, scene):
+        if self._scene is not scene:
+            self._clearDecoratedNodes()
+            self._scene = scene
+            scene.sceneChanged.connect(self._onSceneChanged)
+
+        if self._changed_nodes:
+            # Most changes, like moving a node or the camera, don't change which nodes are decorated.
+            changed_nodes = self._changed_nodes
+            self._changed_nodes = set()
+            if any(self._structure.get(node) != self._nodeStructure(node) for node in changed_nodes):
+                self._decorated_nodes = None
+            if any(not isinstance(node, Camera) for node in changed_nodes):
+                self._node_bounds = None  # Something else than the camera moved.
+
+        if self._decorated_nodes is None:
+            self._node_bounds = None
+            previous = self._decorated_nodes_by_node
+            self._decorated_nodes = []
+            self._decorated_nodes_by_node = {}
+            self._scene_nodes = []
+            self._structure = {}
+            for node in DepthFirstIterator(scene.getRoot()):
+                if isinstance(node, BillboardNode):
+                    continue
+                self._scene_nodes.append(node)
+                structure = self._nodeStructure(node)
+                self._structure[node] = structure
+                mesh_data, is_group, children = structure[1:]
+                # For now we only render nodes that have a mesh, are a group or at least have children.
+                if mesh_data is not None or is_group or children:
+                    decorated = _DecoratedNode(node, mesh_data, is_group)
+                    if node in previous:
+                        decorated.billboard_node = previous[node].billboard_node
+                    self._decorated_nodes.append(decorated)
+                    self._decorated_nodes_by_node[node] = decorated
+
+            # Let go of the bounding boxes of nodes that are no longer decorated, like nodes removed from the scene.
+            for node in [node for node in self._bounding_box_meshes if node not in self._decorated_nodes_by_node]:
+                self._bounding_box_meshes.pop(node).disconnect(node)
+        return self._decorated_nodes
+
+    ##  What decides how a node is decorated: its parent, its mesh, whether it is a group, and its children.
+    def _nodeStructure(self, node):
+        children = tuple(child for child in node.getChildren() if not isinstance(child, BillboardNode))
+        return node.getParent(), node.getMeshData(), bool(node.callDecoration("isGroup")), children
+
+    def _onSceneChanged(self, source):
+        if self._decorated_nodes is not None and not isinstance(source, BillboardNode):
+            self._changed_nodes.add(source)
+
+    def _clearDecoratedNodes(self):
+        if self._scene is not None:
+            self._scene.sceneChanged.disconnect(self._onSceneChanged)
+        self._scene = None
+        self._decorated_nodes = None
+        self._decorated_nodes_by_node = {}
+        self._scene_nodes = []  # All nodes except billboards, in depth first order, collected with the decorated nodes.
+        self._structure = {}  # Node -> what _nodeStructure() returned when the nodes were last collected.
+        self._changed_nodes = set()
+        self._node_bounds = None  # (positions, box minimums, box maximums) of the decorated nodes, see _getNodeBounds().
+
+    ##  How much to draw of each decorated node, see the LOD_ constants. Nodes outside the view of the camera are not
+    #   drawn, and nodes far away from it only get part of their decorations.
+    def _levelsOfDetail(self, camera, decorated_nodes):
+        if not decorated_nodes:
+            return []
+        positions, minimum, maximum = self._getNodeBounds(decorated_nodes)
+        in_view = FrustumCulling.boxesInFrustum(camera.getViewProjectionMatrix().getData(), minimum, maximum)
+        distances = FrustumCulling.distancesTo(positions, camera.getWorldPosition().getData())
+
+        levels = numpy.full(len(decorated_nodes), LOD_MESH_ONLY)
+        levels[distances <= self.name_billboard_distance] = LOD_NAME
+        levels[distances <= self.full_billboard_distance] = LOD_FULL
+        levels[~in_view] = LOD_OUT_OF_VIEW
+        return levels.tolist()
+
+    ##  The world positions and bounding boxes of the decorated nodes as arrays, that are only collected again after
+    #   nodes moved. Nodes without a bounding box get an empty box at their position.
+    def _getNodeBounds(self, decorated_nodes):
+        if self._node_bounds is None:
+            positions = numpy.array([decorated.node.getWorldPosition().getData() for decorated in decorated_nodes], dtype = numpy.float64)
+            minimum = positions.copy()
+            maximum = positions.copy()
+            for row, decorated in enumerate(decorated_nodes):
+                bounding_box = decorated.node.getBoundingBox()
+                if bounding_box:
+                    minimum[row] = bounding_box.minimum.getData()
+                    maximum[row] = bounding_box.maximum.getData()
+            self._node_bounds = (positions, minimum, maximum)
+        return self._node_bounds
 
     def _ensureNodeHasBillboard(self, node):
         billboard_node = node.callDecoration("getBillboard")
@@ -101,15 +270,9 @@ class GodView(View):
             billboard_node.setTemplate(self._billboard_template)
         return billboard_node
 
-    def _matrixToHtml(self, matrix):
-        data = re.sub("[\[\]]", "", numpy.array_str(matrix.getData(), precision = 4, suppress_small = True))
-        data = data.lstrip(" ")  # Remove leading spaces
-        data = data.replace("  ", " ")  # remove double spaces
-        data = data.replace("\n ", "<br>")
-        return data
-
     def endRendering(self):
-        pass
+        # The renderer has drawn the queued nodes in between.
+        self._statistics.endFrame()
 
     def event(self, event):
         # If the view is deactivated, remove all the billboard decorators again.
@@ -117,8 +280,18 @@ class GodView(View):
             scene = self.getController().getScene()
             for node in DepthFirstIterator(scene.getRoot()):
                 node.removeDecorator(BillboardDecorator)
+            for node, bounding_box_mesh in self._bounding_box_meshes.items():
+                bounding_box_mesh.disconnect(node)
+            self._bounding_box_meshes = {}
+            self._clearDecoratedNodes()
+            if self._statistics_label_key is not None:
+                billboard_atlas.release(self._statistics_label_key)
+                self._statistics_label_key = None
 
-    def _getAxisMesh(self, node):
+    ##  The axis gizmo, around the origin. It is queued with the node, so the node's world transformation places it.
+    def _getAxisMesh(self):
+        if self._axis_mesh is not None:
+            return self._axis_mesh
         mb = MeshBuilder()
         mb.addCube(
             width=self.axis_width,
@@ -141,5 +314,56 @@ class GodView(View):
             color=self.XAxisColor,
             center=Vector(self.axis_height / 2, 0, 0)
         )
-        return mb.build().getTransformed(node.getWorldTransformation())
+        self._axis_mesh = mb.build()
+        return self._axis_mesh
+
+    ##  The bounding box of a node as a mesh, which is only built again when the node or its children changed.
+    def _getBoundingBoxMesh(self, node):
+        bounding_box_mesh = self._bounding_box_meshes.get(node)
+        if bounding_box_mesh is None:
+            bounding_box_mesh = _BoundingBoxMesh(node)
+            self._bounding_box_meshes[node] = bounding_box_mesh
+        if bounding_box_mesh.mesh is None:
+            bounding_box = node.getBoundingBox()
+            if bounding_box:
+                mesh_builder = MeshBuilder()
+                mesh_builder.addCube(
+                    width=bounding_box.width,
+                    height=bounding_box.height,
+                    depth=bounding_box.depth,
+                    center=bounding_box.center,
+                    color=Color(0.0, 0.0, 1.0, 1.0)
+                )
+                bounding_box_mesh.mesh = mesh_builder.build()
+        return bounding_box_mesh.mesh
+
+
+##  A node that GodView draws the axis, bounding box and billboard of.
+class _DecoratedNode:
+    def __init__(self, node, mesh_data, is_group):
+        self.node = node
+        self.parent = node.getParent()
+        self.depth = node.getDepth()
+        self.has_mesh = mesh_data is not None
+        self.vertex_count = mesh_data.getVertexCount() if mesh_data is not None else 0
+        self.triangle_count = mesh_data.getFaceCount() if mesh_data is not None else 0
+        self.is_group = is_group
+        self.billboard_node = None  # Made the first time the node is drawn.
+
+
+##  Cached bounding box mesh of a node, that is dropped as soon as the bounding box of the node changes.
+class _BoundingBoxMesh:
+    def __init__(self, node):
+        self.mesh = None
+        node.transformationChanged.connect(self._onChanged)
+        node.boundingBoxChanged.connect(self._onChanged)
+        node.childrenChanged.connect(self._onChanged)
+
+    def disconnect(self, node):
+        node.transformationChanged.disconnect(self._onChanged)
+        node.boundingBoxChanged.disconnect(self._onChanged)
+        node.childrenChanged.disconnect(self._onChanged)
+
+    def _onChanged(self, *args):
+        self.mesh = None
 
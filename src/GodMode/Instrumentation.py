@@ -0,0 +1,177 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import cProfile
+import functools
+import inspect
+import io
+import pstats
+import threading
+import time
+
+PROFILE_LINES = 30
+
+
+##  Opt-in timings and call counts of the stages of a report.
+#
+#   Functions are instrumented by temporarily replacing them on their module or class with a wrapper that counts
+#   the calls and adds up the time spent in them, so nothing is measured (or slowed down) when instrumentation is
+#   off. The times of a stage include the stages called from it. With profile=True, the stages measured with
+#   profiling() are also run under cProfile.
+class Instrumentation:
+    def __init__(self, profile=False):
+        self._profile = profile
+        self._profiles = []
+        self._stages = {}  # Stage name -> [calls, seconds].
+        self._replaced = []
+        self._start_time = time.perf_counter()
+
+    ##  Count and time the calls of owner.name (a function of a module, or a method of a class) as stage.
+    #   Generator functions are timed while they produce their items, not when they are called.
+    def instrument(self, owner, name, stage=None):
+        original = vars(owner)[name]
+        stats = self._stage(stage or name)
+        perf_counter = time.perf_counter
+
+        if inspect.isgeneratorfunction(original):
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                stats[0] += 1
+                return self._timedGenerator(original(*args, **kwargs), stats)
+        else:
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    stats[0] += 1
+                    stats[1] += perf_counter() - start
+
+        setattr(owner, name, wrapper)
+        self._replaced.append((owner, name, original))
+
+    ##  Put back all functions replaced by instrument().
+    def restore(self):
+        for owner, name, original in reversed(self._replaced):
+            setattr(owner, name, original)
+        self._replaced = []
+
+    ##  Add a call of a stage that is not a function of its own.
+    def add(self, stage, seconds, calls=1):
+        stats = self._stage(stage)
+        stats[0] += calls
+        stats[1] += seconds
+
+    ##  Context manager that measures its body as one call of stage.
+    def measure(self, stage):
+        return _Measurement(self._stage(stage))
+
+    ##  Context manager that runs its body under cProfile, if this instrumentation profiles.
+    #
+    #   cProfile only sees the thread it runs on, so every thread that does part of the report uses a profile of
+    #   its own. They are added up in profileText().
+    def profiling(self):
+        if not self._profile:
+            return _Measurement(None)
+        return _Profiling(self._profiles)
+
+    ##  Time since the instrumentation was made, in seconds.
+    def elapsed(self):
+        return time.perf_counter() - self._start_time
+
+    ##  \return List of (stage, calls, seconds) tuples, slowest stage first.
+    def summary(self):
+        return sorted(((stage, calls, seconds) for stage, (calls, seconds) in self._stages.items() if calls), key=lambda row: -row[2])
+
+    def summaryText(self):
+        lines = ["%-40s %10s %12s %12s" % ("stage", "calls", "total ms", "per call us")]
+        for stage, calls, seconds in self.summary():
+            lines.append("%-40s %10d %12.1f %12.2f" % (stage, calls, seconds * 1e3, seconds * 1e6 / calls))
+        lines.append("%-40s %10s %12.1f" % ("elapsed", "", self.elapsed() * 1e3))
+        return "\n".join(lines)
+
+    ##  The functions that took the most time, according to cProfile, or "" if this instrumentation doesn't profile.
+    #   Stops the profiles that are still running.
+    def profileText(self, lines=PROFILE_LINES):
+        if not self._profiles:
+            return ""
+        for profile in self._profiles:
+            profile.disable()
+        output = io.StringIO()
+        stats = pstats.Stats(self._profiles[0], stream=output)
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        stats.sort_stats("cumulative").print_stats(lines)
+        return output.getvalue()
+
+    def _stage(self, stage):
+        return self._stages.setdefault(stage, [0, 0.0])
+
+    def _timedGenerator(self, generator, stats):
+        perf_counter = time.perf_counter
+        while True:
+            start = perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                stats[1] += perf_counter() - start
+                return
+            stats[1] += perf_counter() - start
+            yield item
+
+class _Measurement:
+    def __init__(self, stats):
+        self._stats = stats
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        if self._stats is not None:
+            self._stats[0] += 1
+            self._stats[1] += time.perf_counter() - self._start
+
+class _Profiling:
+    def __init__(self, profiles):
+        self._profiles = profiles
+        self._profile = cProfile.Profile()
+
+    def __enter__(self):
+        try:
+            self._profile.enable()
+        except ValueError:
+            return self  # Since Python 3.12 only one profile can run at a time. This part is then left out.
+        self._profiles.append(self._profile)
+        return self
+
+    def __exit__(self, *args):
+        self._profile.disable()
+
+# Instrumentation replaces functions for everybody, so only one report can be instrumented at a time.
+_current = None
+_current_lock = threading.Lock()
+
+##  Start instrumenting the given functions.
+#   \param functions List of (owner, name, stage) tuples, see Instrumentation.instrument().
+#   \return The new Instrumentation, or None if another report is being instrumented.
+def beginInstrumentation(functions, profile=False):
+    global _current
+    with _current_lock:
+        if _current is not None:
+            return None
+        _current = Instrumentation(profile)
+        for owner, name, stage in functions:
+            _current.instrument(owner, name, stage)
+        return _current
+
+def currentInstrumentation():
+    return _current
+
+def endInstrumentation(instrumentation):
+    global _current
+    with _current_lock:
+        instrumentation.restore()
+        if _current is instrumentation:
+            _current = None
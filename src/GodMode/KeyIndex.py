@@ -0,0 +1,46 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import json
+
+
+##  Search index for the key filter of a report page.
+#
+#   Key rows are numbered in the order they appear in the page, including rows that are loaded lazily. The index
+#   maps every distinct key to its rows, and every trigram of the lower case keys to the keys that contain it, so
+#   the filter only has to look at a few hundred keys instead of every row in the page. Rows of stacks can also have
+#   facets (see SnapshotBuilder._stackFacets()); the index holds the rows of every facet.
+class KeyIndex:
+    def __init__(self):
+        self._key_indices = {}
+        self._keys = []
+        self._rows = []
+        self._facets = {}
+        self.row_count = 0
+
+    ##  Register the key rows of one table, and return the id of its first row.
+    def addRows(self, keys, facets=None):
+        first_row = self.row_count
+        for key in keys:
+            index = self._key_indices.get(key)
+            if index is None:
+                index = len(self._keys)
+                self._key_indices[key] = index
+                self._keys.append(key)
+                self._rows.append([])
+            self._rows[index].append(self.row_count)
+            if facets is not None:
+                for facet in facets.get(key, ()):
+                    self._facets.setdefault(facet, []).append(self.row_count)
+            self.row_count += 1
+        return first_row
+
+    def toJson(self):
+        trigrams = {}
+        for index, key in enumerate(self._keys):
+            lower_key = key.lower()
+            for trigram in sorted({lower_key[i:i + 3] for i in range(len(lower_key) - 2)}):
+                trigrams.setdefault(trigram, []).append(index)
+
+        data = {"keys": self._keys, "rows": self._rows, "row_count": self.row_count, "trigrams": trigrams, "facets": self._facets}
+        return json.dumps(data, separators=(",", ":")).replace("</", "<\\/")
@@ -0,0 +1,134 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import http.server
+import json
+import queue
+import secrets
+import threading
+
+SEND_BUFFER_SIZE = 64 * 1024
+KEEP_ALIVE_INTERVAL = 15  # Seconds
+
+
+##  Small HTTP server on the loopback interface that serves one report page and pushes events to it.
+#
+#   The page is rendered on the server thread of each request, so render_page must only use snapshots. Events
+#   are sent to all open pages as server-sent events, on "events" next to the page.
+#
+#   Any web page the user visits can make the browser send requests to the loopback interface, and with DNS rebinding
+#   read the answers too. So the page is only served under a random path, and only to requests for 127.0.0.1 itself.
+class LiveReportServer:
+    def __init__(self, render_page):
+        self._render_page = render_page
+        self._server = None
+        self._thread = None
+        self._token = None
+        self._clients = []
+        self._clients_lock = threading.Lock()
+
+    def isRunning(self):
+        return self._server is not None
+
+    ##  Start serving, and return the URL of the page.
+    def start(self):
+        if self._server is None:
+            self._token = secrets.token_urlsafe(16)
+            self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _LiveReportRequestHandler)
+            self._server.daemon_threads = True
+            self._server.live_report_server = self
+            self._thread = threading.Thread(target = self._server.serve_forever, name = "GodModeLiveReport", daemon = True)
+            self._thread.start()
+        return "http://%s/%s/" % (self._host(), self._token)
+
+    def stop(self):
+        if self._server is None:
+            return
+        with self._clients_lock:
+            for client in self._clients:
+                client.put(None)
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+        self._token = None
+
+    ##  Send an event to all open pages. The data must be JSON serializable.
+    def publish(self, event_name, data):
+        message = "event: " + event_name + "\ndata: " + json.dumps(data) + "\n\n"
+        with self._clients_lock:
+            for client in self._clients:
+                client.put(message)
+
+    def _host(self):
+        return "127.0.0.1:%d" % self._server.server_address[1]
+
+    def _addClient(self):
+        client = queue.Queue()
+        with self._clients_lock:
+            self._clients.append(client)
+        return client
+
+    def _removeClient(self, client):
+        with self._clients_lock:
+            self._clients.remove(client)
+
+
+class _LiveReportRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        live_report_server = self.server.live_report_server
+        if self.headers.get("Host") != live_report_server._host():
+            self.send_error(403)
+            return
+        prefix = "/" + live_report_server._token + "/"
+        if self.path == prefix:
+            self._sendPage()
+        elif self.path == prefix + "events":
+            self._sendEvents()
+        else:
+            self.send_error(404)
+
+    def _sendPage(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        buffer = []
+        buffer_size = 0
+        for chunk in self.server.live_report_server._render_page():
+            buffer.append(chunk)
+            buffer_size += len(chunk)
+            if buffer_size >= SEND_BUFFER_SIZE:
+                self.wfile.write("".join(buffer).encode("utf-8"))
+                buffer = []
+                buffer_size = 0
+        self.wfile.write("".join(buffer).encode("utf-8"))
+
+    def _sendEvents(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        live_report_server = self.server.live_report_server
+        client = live_report_server._addClient()
+        try:
+            while True:
+                try:
+                    message = client.get(timeout = KEEP_ALIVE_INTERVAL)
+                except queue.Empty:
+                    message = ": keep alive\n\n"
+                if message is None:
+                    break
+                self.wfile.write(message.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            live_report_server._removeClient(client)
+
+    # Don't write every request to stderr.
+    def log_message(self, format, *args):
+        pass
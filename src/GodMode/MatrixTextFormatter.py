@@ -0,0 +1,51 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+
+##  Formats many 4x4 matrices as billboard text at once, and only formats the matrices that changed since the last
+#   frame again.
+#
+#   Every value is printed with a fixed width, so the changed matrices are found, cleaned up and formatted with a
+#   few array operations and one format string, instead of with numpy.array_str and string replacements per node.
+class MatrixTextFormatter:
+    def __init__(self, precision = 4, width = 10):
+        row_format = " ".join(["%%%d.%df" % (width, precision)] * 4)
+        self._matrix_format = "<br>".join([row_format] * 4)
+        self._smallest = 0.5 * 10 ** -precision  # Smaller values are printed as 0, and never as -0.
+        self._keys = []
+        self._rows = {}  # Key -> row in _matrices and _texts.
+        self._matrices = numpy.empty((0, 4, 4))
+        self._texts = numpy.empty(0, dtype = object)
+
+    ##  Format the matrices of this frame.
+    #   \param keys One key per matrix, that identifies it between frames (usually the node the matrix belongs to).
+    #   \param matrices (N, 4, 4) array.
+    #   \return List of N strings, with the rows of the matrix separated by <br>.
+    def format(self, keys, matrices):
+        matrices = numpy.asarray(matrices, dtype = numpy.float64).reshape(-1, 4, 4)
+        texts = numpy.empty(len(keys), dtype = object)
+
+        if keys == self._keys:
+            previous = numpy.arange(len(keys))
+        else:
+            previous = numpy.array([self._rows.get(key, -1) for key in keys], dtype = numpy.intp)
+            self._rows = {key: row for row, key in enumerate(keys)}
+            self._keys = list(keys)
+        known = previous >= 0
+        changed = ~known
+        changed[known] = numpy.any(matrices[known] != self._matrices[previous[known]], axis = (1, 2))
+
+        texts[known] = self._texts[previous[known]]
+        if changed.any():
+            texts[changed] = self._formatMatrices(matrices[changed])
+
+        self._matrices = matrices
+        self._texts = texts
+        return texts.tolist()
+
+    def _formatMatrices(self, matrices):
+        values = numpy.where(numpy.abs(matrices) < self._smallest, 0.0, matrices)
+        # One format string for a whole matrix is faster than numpy.char, which formats value by value.
+        return [self._matrix_format % tuple(matrix) for matrix in values.reshape(-1, 16).tolist()]
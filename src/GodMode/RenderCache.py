@@ -0,0 +1,48 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import collections
+import threading
+
+
+##  Least recently used cache of rendered HTML fragments.
+#
+#   Fragments are keyed on a change token from the ChangeTracker plus whatever render options were used, so a
+#   container that is shown several times, in one report or over several reports, is only formatted once until
+#   it changes. The cache is used from report jobs, so it is thread safe.
+#
+#   The cache lives as long as Cura runs, so it is kept small. Fragments are counted in UTF-8 bytes, which is about
+#   what a mostly ASCII string takes in memory, and what it takes in a written page.
+class RenderCache:
+    def __init__(self, max_size = 16 * 1024 * 1024):
+        self._max_size = max_size  # In bytes.
+        self._size = 0
+        self._fragments = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    ##  Get a fragment from the cache, or render it with render_function and store it.
+    def get(self, key, render_function):
+        with self._lock:
+            entry = self._fragments.get(key)
+            if entry is not None:
+                self._fragments.move_to_end(key)
+                return entry[0]
+
+        fragment = render_function()
+        size = len(fragment.encode("utf-8"))
+        if size > self._max_size:
+            return fragment
+
+        with self._lock:
+            if key not in self._fragments:
+                self._fragments[key] = (fragment, size)
+                self._size += size
+                while self._size > self._max_size:
+                    _, (_, evicted_size) = self._fragments.popitem(last = False)
+                    self._size -= evicted_size
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self._size = 0
@@ -0,0 +1,156 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+##  Render the report pages of saved registry snapshots (see SnapshotFile), without Cura.
+#
+#   Usage, from the src directory:
+#     python -m GodMode.RenderReports [-o output_dir] [-j jobs] snapshot.godsnap [snapshot.godsnap ...]
+#     python -m GodMode.RenderReports [-o output_dir] --diff old.godsnap new.godsnap
+#
+#   The pages of each snapshot file are written to a directory of their own in the output directory. The
+#   containers and stacks are formatted in a pool of worker processes, one container or stack per task, and the
+#   fragments are put in the render cache of the main process, which then writes the pages.
+
+import argparse
+import concurrent.futures
+import os
+import sys
+
+from .DataProvider import SnapshotFileDataProvider
+from .ReportFormat import htmlPage, containersOfTypeHtmlPage, allStacksHtmlPage, effectiveValuesHtmlPage, stackDiffHtmlPage, renderContainer, render_cache
+from .ReportWriter import writeHtmlPage
+
+TASK_CHUNK_SIZE = 16
+
+# Page names of the container types, the same as the menu items of the plugin use.
+container_pages = {
+    "machine": ("cura_machines.html", "Machines"),
+    "material": ("cura_materials.html", "Materials"),
+    "quality": ("cura_qualities.html", "Quality"),
+    "quality_changes": ("cura_quality_changes.html", "Quality Changes"),
+    "user": ("cura_user_containers.html", "User Containers"),
+    "variant": ("cura_variants.html", "Variants")
+}
+
+##  The pages of one snapshot file.
+#   \return List of (page name, page generator function, fragments) tuples, where fragments is a list of
+#   (snapshot, name, show_keys) tuples of all the containers the page formats (see ReportFormat.formatContainer()).
+def reportPages(provider):
+    pages = []
+    if provider.hasActiveStacks():
+        global_stack, extruder_stacks = provider.activeStacks()
+        fragments = []
+        for stack in [global_stack] + extruder_stacks:
+            fragments.append((stack, "Container Stack", True))
+            fragments += [(container, "Container", True) for container in stack.containers]
+        pages.append(("cura_settings.html", lambda: htmlPage(global_stack, extruder_stacks), fragments))
+        pages.append(("cura_effective_values.html", lambda: effectiveValuesHtmlPage(global_stack, extruder_stacks), []))
+
+    stacks = provider.allStacks()
+    fragments = []
+    for stack in stacks:
+        fragments.append((stack, "Container Stack", True))
+        fragments += [(container, "Container", False) for container in stack.containers]
+    pages.append(("cura_stacks.html", lambda: allStacksHtmlPage(stacks), fragments))
+
+    for type_ in ["machine"] + provider.containerTypes():
+        containers = provider.containersOfType(type_)
+        page_name, name = container_pages.get(type_, ("cura_" + type_ + ".html", type_))
+        fragments = [(container, "Container", True) for container in containers]
+        pages.append((page_name, lambda name=name, containers=containers: containersOfTypeHtmlPage(name, containers), fragments))
+    return pages
+
+# The snapshot file a worker process has open. Files are rendered one after the other, so one is enough.
+_worker_provider = None
+_worker_path = None
+
+##  Format one container in a worker process.
+def renderFragment(task):
+    global _worker_provider, _worker_path
+    path, anchor, name, show_keys = task
+    if path != _worker_path:
+        if _worker_provider is not None:
+            _worker_provider.close()
+        _worker_provider = SnapshotFileDataProvider(path)
+        _worker_path = path
+    return "".join(renderContainer(_worker_provider.snapshot(anchor), name, show_keys))
+
+##  Write the pages of one snapshot file to output_dir.
+#   \param executor Process pool to format the containers in, or None to format them in this process.
+def renderSnapshotFile(path, output_dir, executor=None, compress=False):
+    os.makedirs(output_dir, exist_ok=True)
+    with SnapshotFileDataProvider(path) as provider:
+        pages = reportPages(provider)
+        page_results = []
+        for _, _, fragments in pages:
+            # Keyed like ReportFormat.formatContainer() keys the render cache, so every fragment is formatted once.
+            keys = {}
+            for snapshot, name, show_keys in fragments:
+                keys.setdefault((snapshot.token, name, show_keys), (path, snapshot.anchor, name, show_keys))
+            results = executor.map(renderFragment, keys.values(), chunksize=TASK_CHUNK_SIZE) if executor is not None else None
+            page_results.append((keys, results))
+
+        # The workers continue with the next pages while a page is written.
+        for (page_name, page, _), (keys, results) in zip(pages, page_results):
+            if results is not None:
+                for key, fragment in zip(keys, results):
+                    render_cache.get(key, lambda: fragment)
+            if writeHtmlPage(os.path.join(output_dir, page_name), page(), compress=compress):
+                print("Wrote " + os.path.join(output_dir, page_name))
+            else:
+                print("Unchanged " + os.path.join(output_dir, page_name))
+    render_cache.clear()
+
+##  The stacks to compare between two snapshot files, as (old, new) tuples: the active stacks with each other, also
+#   when they are stacks of different machines, then every other stack with the stack with the same id.
+def stackDiffPairs(old_provider, new_provider):
+    pairs = []
+    if old_provider.hasActiveStacks() and new_provider.hasActiveStacks():
+        old_global_stack, old_extruder_stacks = old_provider.activeStacks()
+        new_global_stack, new_extruder_stacks = new_provider.activeStacks()
+        pairs += zip([old_global_stack] + old_extruder_stacks, [new_global_stack] + new_extruder_stacks)
+    old_paired = {old.container_id for old, _ in pairs}
+    new_paired = {new.container_id for _, new in pairs}
+    new_stacks = {stack.container_id: stack for stack in new_provider.allStacks(with_container_keys=False)}
+    for old in old_provider.allStacks(with_container_keys=False):
+        if old.container_id in new_stacks and old.container_id not in old_paired and old.container_id not in new_paired:
+            pairs.append((old, new_stacks[old.container_id]))
+    return pairs
+
+##  Write a page with the differences between the stacks of two snapshot files to output_dir.
+def diffSnapshotFiles(old_path, new_path, output_dir, compress=False):
+    os.makedirs(output_dir, exist_ok=True)
+    target = os.path.join(output_dir, "cura_stack_diff.html")
+    with SnapshotFileDataProvider(old_path) as old_provider, SnapshotFileDataProvider(new_path) as new_provider:
+        if writeHtmlPage(target, stackDiffHtmlPage(stackDiffPairs(old_provider, new_provider)), compress=compress):
+            print("Wrote " + target)
+        else:
+            print("Unchanged " + target)
+    render_cache.clear()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the God Mode reports of saved registry snapshots.")
+    parser.add_argument("snapshot_files", nargs="*", help="Snapshot files saved with 'Save Registry Snapshot'.")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="Compare the stacks of two snapshot files instead.")
+    parser.add_argument("-o", "--output", default="god_mode_reports", help="Directory to write the pages to.")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument("-z", "--gzip", action="store_true", help="Store the pages gzip compressed, for archiving.")
+    args = parser.parse_args(argv)
+    if args.diff:
+        diffSnapshotFiles(args.diff[0], args.diff[1], args.output, args.gzip)
+        return 0
+    if not args.snapshot_files:
+        parser.error("give the snapshot files to render, or --diff OLD NEW")
+
+    executor = concurrent.futures.ProcessPoolExecutor(args.jobs) if args.jobs > 1 else None
+    try:
+        for path in args.snapshot_files:
+            name = os.path.splitext(os.path.basename(path))[0]
+            renderSnapshotFile(path, os.path.join(args.output, name), executor, args.gzip)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import time
+
+SMOOTHING = 0.1  # Weight of the newest frame in the shown times, so they don't flicker.
+REFRESH_INTERVAL = 0.25  # Seconds between updates of the shown text, which has to be rendered into a texture.
+
+
+##  Counters of what GodView draws per frame, and how long that takes.
+#
+#   GodView calls beginFrame() at the start of beginRendering(), endQueue() at its end and endFrame() in endRendering(),
+#   so the frame time includes the draw calls of the renderer in between. Cura only renders when something changed,
+#   so the time between frames says nothing about how expensive they are, and is not measured. GodView adds to the
+#   counters of the current frame in between. Counting is cheap, so it is always done, also when the statistics are
+#   not shown.
+class RenderStatistics:
+    def __init__(self):
+        self.queue_time = 0.0  # Seconds spent in beginRendering, queueing the nodes, smoothed.
+        self.frame_time = 0.0  # Seconds from the start of beginRendering to the end of endRendering, smoothed.
+        self._frame_start = None
+        self._text = None
+        self._text_time = 0.0
+        self._resetCounters()
+        self._previous_counters = self._counters()
+
+    def beginFrame(self):
+        self._frame_start = time.perf_counter()
+        self._previous_counters = self._counters()
+        self._resetCounters()
+
+    def endQueue(self):
+        self.queue_time = self._smooth(self.queue_time, time.perf_counter() - self._frame_start)
+
+    def endFrame(self):
+        if self._frame_start is not None:
+            self.frame_time = self._smooth(self.frame_time, time.perf_counter() - self._frame_start)
+            self._frame_start = None
+
+    ##  Count a mesh that was queued to be drawn.
+    def addMesh(self, vertex_count, triangle_count):
+        self.queued_nodes += 1
+        self.vertices += vertex_count
+        self.triangles += triangle_count
+
+    ##  The statistics of the previous frame as billboard text, which only changes every REFRESH_INTERVAL seconds.
+    def html(self):
+        now = time.perf_counter()
+        if self._text is None or now - self._text_time >= REFRESH_INTERVAL:
+            self._text_time = now
+            self._text = ("<html><H2>GodView</H2><b>"
+                          "Queue nodes (beginRendering): %.1f ms<br>"
+                          "Queue and draw calls: %.1f ms<br>"
+                          "Queued nodes: %d<br>"
+                          "Texture uploads: %d<br>"
+                          "Vertices: %d<br>"
+                          "Triangles: %d<br>"
+                          "Decorated nodes: %d of %d</b></html>") % (
+                (self.queue_time * 1e3, self.frame_time * 1e3) + self._previous_counters)
+        return self._text
+
+    def _smooth(self, average, value):
+        if not average:
+            return value
+        return average + (value - average) * SMOOTHING
+
+    def _counters(self):
+        return self.queued_nodes, self.texture_uploads, self.vertices, self.triangles, self.drawn_nodes, self.decorated_nodes
+
+    def _resetCounters(self):
+        self.queued_nodes = 0
+        self.texture_uploads = 0
+        self.vertices = 0
+        self.triangles = 0
+        self.decorated_nodes = 0  # Nodes that GodView decorates.
+        self.drawn_nodes = 0  # Decorated nodes that were in view.
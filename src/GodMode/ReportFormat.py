@@ -0,0 +1,825 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+from .KeyIndex import KeyIndex
+from .RenderCache import RenderCache
+from .ReportWriter import prepareFragmentDirectory, writeScriptCall
+from .StackDiff import diffContainers, diffSettings
+
+import os.path
+import html
+import json
+
+encode = html.escape
+
+# The report pages are made from ContainerSnapshots only, see DataProvider, so this module doesn't need Cura.
+
+# Shared by all reports, so containers that didn't change since the last report aren't formatted again.
+render_cache = RenderCache()
+
+def getHtmlHeader(page_name="Cura Settings"):
+    return """<!DOCTYPE html><html>
+<head>
+<meta charset="UTF-8">
+<title>""" + encode(page_name) + """</title>
+<script>
+""" + keyFilterJS() + lazySectionsJS() + """
+</script>
+<style>
+html {
+  font-family: sans-serif;
+  font-size: 11pt;
+}
+
+a, a:visited {
+  color: #0000ff;
+  text-decoration: none;
+}
+
+ul {
+  padding-left: 1em;
+}
+
+div.menu {
+  position: fixed;
+  padding: 4px;
+  left: 0px;
+  width: 25em;
+  top: 0px;
+  height: 100%;
+  box-sizing: border-box;
+  overflow: auto;
+}
+
+div.contents {
+  padding-left: 25em;
+}
+
+table.key_value_table {
+  border-collapse: separate;
+  border: 1px solid #e0e0e0;
+  margin-top: 16px;
+  border-top-left-radius: 5px;
+  border-top-right-radius: 5px;
+  border-bottom-left-radius: 4px;
+  border-bottom-right-radius: 4px;
+  border-spacing: 0px;
+}
+
+table.key_value_table th, table.key_value_table td {
+  padding: 4px;
+}
+
+table.key_value_table > thead th {
+  width: 65em;
+  text-align: left;
+  background-color: #428bca;
+  color: #ffffff;
+  border-top-left-radius: 4px;
+  border-top-right-radius: 4px;
+}
+
+table.key_value_table > tbody > tr:nth-child(even) {
+  background-color: #e0e0e0;
+}
+
+table.key_value_table > tbody > tr.exception {
+  background-color: #e08080;
+}
+
+table.key_value_table > tbody > tr.duplicate {
+  background-color: #f0c080;
+}
+table.key_value_table td.key {
+  width: 25em;
+  font-weight: bold;
+  font-weight: bold;
+}
+
+table.key_value_table tr.preformat td.value {
+  white-space: pre;
+}
+
+table.diff_table > thead th {
+  width: 30em;
+}
+
+table.value_matrix > thead th {
+  width: auto;
+  border-radius: 0;
+}
+
+table.value_matrix td.differs {
+  font-weight: bold;
+  color: #a04000;
+}
+
+div.container_stack {
+  padding: 8px;
+  border: 2px solid black;
+  border-radius: 8px;
+}
+
+div.container_stack > table.key_value_table > thead th {
+  background-color: #18294D;
+}
+
+div.container_stack_containers {
+  margin: 4px;
+  padding: 4px;
+  border: 1px dotted black;
+  border-radius: 4px;
+}
+
+tr.key_hide {
+  display: none;
+}
+
+body.hide_metadata tr.metadata {
+  display: none;
+}
+
+ul.property_list {
+  list-style: none;
+  padding-left: 0;
+  margin-left: 0;
+}
+
+span.prop_name {
+  font-weight: bold;
+}
+</style>
+</head>
+<body onload='initKeyFilter(); initLazySections();'>
+"""
+
+##  \param extra_html Put at the end of the page, for instance to add scripts.
+def htmlPage(global_stack, extruder_stacks, extra_html=""):
+    key_index = KeyIndex()
+    yield getHtmlHeader()
+
+    yield "<div class='menu'>\n"
+    yield "<ul>"
+    yield "<li><a href='#global_stack'>Global Stack</a>"
+    yield from formatContainerStackMenu(global_stack)
+    yield "</li>\n"
+
+    yield "<li><a href='#extruder_stacks'>Extruder Stacks</a>\n"
+    yield from formatExtruderStacksMenu(extruder_stacks)
+    yield "</li>\n"
+
+    yield "</ul>\n"
+    yield keyFilterWidget()
+    yield "</div>"
+
+    yield "<div class='contents'>"
+    yield "<h2 id='global_stack'>Global Stack</h2>"
+    yield from formatContainerStack(global_stack, key_index=key_index)
+
+    yield from formatExtruderStacks(extruder_stacks, key_index)
+
+    yield "</div>"
+
+    yield formatKeyIndex(key_index)
+    yield extra_html
+    yield htmlFooter
+
+##  \param fragment_dir If given, only the metadata of the containers is put in the page. The keys of each container
+#   are written to a separate script in this directory, which the page loads once the container scrolls into view.
+def containersOfTypeHtmlPage(name, containers, fragment_dir=None):
+    key_index = KeyIndex()
+    yield getHtmlHeader(name)
+
+    yield "<div class='menu'>\n"
+    yield "<ul>"
+    for container in containers:
+        yield "<li><a href='#"+ container.anchor + "'>"+encode(container.container_id)+"</a></li>\n"
+    yield "</ul>"
+
+    yield keyFilterWidget()
+    yield "</div>"
+
+    yield "<div class='contents'>"
+    if fragment_dir is None:
+        yield from formatAllContainersOfType(name, containers, key_index)
+    else:
+        yield from formatAllContainersOfTypeLazy(name, containers, fragment_dir, key_index)
+    yield "</div>"
+
+    yield formatKeyIndex(key_index)
+    yield htmlFooter
+
+def allStacksHtmlPage(stacks):
+    key_index = KeyIndex()
+    yield getHtmlHeader("All Stacks")
+
+    yield "<div class='menu'>\n"
+    yield "<ul>"
+    for container in stacks:
+        yield "<li><a href='#"+ container.anchor + "'>"+encode(container.container_id)+"</a></li>\n"
+    yield "</ul>"
+    yield keyFilterWidget()
+    yield "</div>"
+
+    yield "<div class='contents'>"
+    for stack in stacks:
+        yield from formatContainerStack(stack, show_stack_keys=False, key_index=key_index)
+    yield "</div>"
+
+    yield formatKeyIndex(key_index)
+    yield htmlFooter
+
+def stackDiffHtmlPage(stack_pairs):
+    key_index = KeyIndex()
+    yield getHtmlHeader("Stack Differences")
+
+    yield "<div class='menu'>\n"
+    yield "<ul>"
+    for position, (left, right) in enumerate(stack_pairs):
+        yield "<li><a href='#diff_" + str(position) + "'>" + encode(left.container_id) + " &harr; " + encode(right.container_id) + "</a></li>\n"
+    yield "</ul>"
+    yield keyFilterWidget()
+    yield "</div>"
+
+    yield "<div class='contents'>"
+    for position, (left, right) in enumerate(stack_pairs):
+        yield "<a id='diff_" + str(position) + "' ></a>"
+        yield from formatStackDiff(left, right, key_index)
+    yield "</div>"
+
+    yield formatKeyIndex(key_index)
+    yield htmlFooter
+
+##  One table with the value of every key in the global stack and in each extruder stack, side by side.
+#
+#   The values come from the stack snapshots, which resolve every key of a stack in one pass. Keys that have the same
+#   value in all stacks are collapsed into one value, in a table of their own after the keys that differ.
+def effectiveValuesHtmlPage(global_stack, extruder_stacks):
+    key_index = KeyIndex()
+    stacks = [global_stack] + extruder_stacks
+    differing, same = effectiveValueRows(stacks)
+    yield getHtmlHeader("Effective Values")
+
+    yield "<div class='menu'>\n"
+    yield "<ul>"
+    yield "<li><a href='#differing_values'>Different per stack (" + str(len(differing)) + ")</a></li>\n"
+    yield "<li><a href='#same_values'>Same in all stacks (" + str(len(same)) + ")</a></li>\n"
+    yield "</ul>\n"
+    yield keyFilterWidget()
+    yield "</div>"
+
+    yield "<div class='contents'>"
+    yield "<h2 id='differing_values'>Different per stack</h2>"
+    yield "<table class='key_value_table value_matrix'>\n"
+    # The stacks themselves are on the settings page, next to this one.
+    yield "<thead><tr><th>Key</th>" + "".join("<th><a href='cura_settings.html#" + stack.anchor + "'>" + encode(stack.container_id) + "</a></th>" for stack in stacks) + "</tr></thead>\n<tbody>\n"
+    key_index.addRows(key for key, _ in differing)
+    for key, values in differing:
+        cells = []
+        for value in values:
+            if value is None:
+                cells.append("<td class='value'><i>missing</i></td>")
+            else:
+                cells.append("<td class='value" + (" differs" if value != values[0] else "") + "'>" + encode(value) + "</td>")
+        yield "<tr --data-key='" + encode(key) + "'><td class='key'>&#x1f511; " + encode(key) + "</td>" + "".join(cells) + "</tr>\n"
+    yield tableFooter()
+
+    yield "<h2 id='same_values'>Same in all stacks</h2>"
+    yield "<table class='key_value_table value_matrix'>\n"
+    yield "<thead><tr><th>Key</th><th>Value</th></tr></thead>\n<tbody>\n"
+    key_index.addRows(key for key, _ in same)
+    for key, value in same:
+        yield formatSettingsKeyTableRow(key, value)
+    yield tableFooter()
+    yield "</div>"
+
+    yield formatKeyIndex(key_index)
+    yield htmlFooter
+
+##  The effective value of every key in the stacks, in one pass over the keys.
+#   \return Tuple of a list of (key, [value per stack]) of the keys that differ between the stacks, and a list of
+#   (key, value) of the keys that are the same in all stacks. Values are None for stacks that don't have the key.
+def effectiveValueRows(stacks):
+    differing = []
+    same = []
+    settings = [stack.settings for stack in stacks]
+    for key in sorted(set().union(*settings)):
+        values = [stack_settings[key].get("value") if key in stack_settings else None for stack_settings in settings]
+        if values.count(values[0]) == len(values):
+            same.append((key, values[0]))
+        else:
+            differing.append((key, values))
+    return differing, same
+
+def formatStackDiff(left, right, key_index):
+    yield "<table class=\"key_value_table diff_table\">\n"
+    yield "<thead><tr><th>Key</th><th>" + encode(left.container_id) + "</th><th>" + encode(right.container_id) + "</th></tr></thead>\n"
+    yield "<tbody>\n"
+    for position, left_id, right_id in diffContainers(left, right):
+        yield "<tr class='metadata'><td class='key'>container " + str(position) + "</td><td class='value'>" + encode(str(left_id)) + "</td><td class='value'>" + encode(str(right_id)) + "</td></tr>\n"
+
+    differences = list(diffSettings(left.settings, right.settings))
+    key_index.addRows(key for key, _, _ in differences)
+    for key, left_values, right_values in differences:
+        yield "<tr --data-key='" + encode(key) + "'><td class='key'>&#x1f511; " + encode(key) + "</td>"
+        yield "<td class='value'>" + formatDiffValue(left_values) + "</td><td class='value'>" + formatDiffValue(right_values) + "</td></tr>\n"
+    yield "<tr class='metadata'><td class='key'>differences</td><td class='value' colspan='2'>" + str(len(differences)) + " of " + str(len(set(left.settings) | set(right.settings))) + " keys</td></tr>\n"
+    yield tableFooter()
+
+def formatDiffValue(prop_values):
+    if prop_values is None:
+        return "<i>missing</i>"
+    return formatSettingValue(prop_values).value
+
+def formatExtruderStacks(extruder_stacks, key_index=None):
+    yield "<h2 id='extruder_stacks'>Extruder Stacks</h2>"
+    for position, extruder_stack in enumerate(extruder_stacks, 1):
+        position = str(position)
+        yield "<h3 id='extruder_index_" + position + "'>Index " + position + "</h3>"
+        yield from formatContainerStack(extruder_stack, key_index=key_index)
+
+def formatExtruderStacksMenu(extruder_stacks):
+    yield "<ul>"
+    for position, extruder_stack in enumerate(extruder_stacks, 1):
+        yield "<li>"
+        yield "<a href='#extruder_index_" + str(position) + "'>Index " + str(position) + "</a>\n"
+        yield from formatContainerStackMenu(extruder_stack)
+        yield "</li>"
+    yield "</ul>"
+
+def formatAllContainersOfType(name, containers, key_index=None):
+    yield "<h2>" + name + "</h2>\n"
+
+    for container in containers:
+        yield from formatContainer(container, key_index=key_index)
+
+def formatAllContainersOfTypeLazy(name, containers, fragment_dir, key_index):
+    yield "<h2>" + name + "</h2>\n"
+
+    prepareFragmentDirectory(fragment_dir, [container.anchor + ".js" for container in containers])
+    for container in containers:
+        fragment_name = container.anchor + ".js"
+        writeScriptCall(os.path.join(fragment_dir, fragment_name), "lazyKeysLoaded", container.anchor, formatContainerKeys(container))
+
+        yield "<a id='" + container.anchor + "' ></a>"
+        yield from formatContainerMetaDataOnly(container)
+        first_row = key_index.addRows(container.settings)
+        yield "<div class='lazy_keys' id='keys_" + container.anchor + "' data-first-row='" + str(first_row) + "' data-src='" + encode(os.path.basename(fragment_dir) + "/" + fragment_name) + "'>"
+        yield "<button onclick='loadLazySection(this.parentNode);'>&#x1f511; Show " + str(len(container.settings)) + " keys</button>"
+        yield "</div>\n"
+
+##  The keys of a container as a table of their own, see formatAllContainersOfTypeLazy().
+def formatContainerKeys(container):
+    def render():
+        return "".join([tableHeader("Keys: " + container.container_id)] + list(formatSettingsKeyTableRows(container)) + [tableFooter()])
+    if container.token is None:
+        return render()
+    return render_cache.get((container.token, "keys"), render)
+
+def formatContainerStack(stack, show_stack_keys=True, key_index=None):
+    yield "<div class='container_stack'>\n"
+    yield from formatContainer(stack, name="Container Stack", key_index=key_index)
+    yield "<div class='container_stack_containers'>\n"
+    yield "<h3>Containers</h3>\n"
+    for container in stack.containers:
+        yield from formatContainer(container, show_keys=show_stack_keys, key_index=key_index)
+    yield "</div>\n"
+    yield "</div>\n"
+
+def formatContainerStackMenu(stack):
+    yield "<a href='#" + stack.anchor + "'></a><br />\n"
+    yield "<ul>\n"
+    for container in stack.containers:
+        yield "<li><a href='#" + container.anchor + "'>" + encode(container.container_id) + "</a></li>"
+    yield "</ul>\n"
+
+def formatContainerMetaDataOnly(container):
+    yield tableHeader("Container: " + container.container_id)
+    yield from formatContainerMetaDataRows(container)
+    yield tableFooter()
+
+##  \param key_index The KeyIndex of the page, if it has one. The key rows of the container are added to it.
+def formatContainer(container, name="Container", show_keys=True, key_index=None):
+    if show_keys and key_index is not None:
+        key_index.addRows(container.settings, container.facets)
+
+    if container.token is None:
+        yield from renderContainer(container, name, show_keys)
+    else:
+        yield render_cache.get((container.token, name, show_keys), lambda: "".join(renderContainer(container, name, show_keys)))
+
+def renderContainer(container, name, show_keys):
+    yield "<a id='" + container.anchor + "' ></a>"
+    yield tableHeader(name + ": " + container.container_id)
+    yield from formatContainerMetaDataRows(container)
+
+    if show_keys:
+        yield from formatSettingsKeyTableRows(container)
+
+    yield tableFooter()
+
+def formatSettingsKeyTableRows(container):
+    for key, prop_values in container.settings.items():
+        yield formatSettingsKeyTableRow(key, formatSettingValue(prop_values))
+
+def formatContainerMetaDataRows(container):
+    for key, text, clazz in container.metadata_rows:
+        yield formatKeyValueTableRow(key, RawHtml(encode(text)), extra_class="metadata " + clazz)
+
+def formatSettingValue(prop_values):
+    parts = ["<ul class=\"property_list\">\n"]
+    for prop_name, prop_value in prop_values.items():
+        parts.append("  <li>\n    <span class='prop_name'>" + encode(prop_name) + ":</span> " + encode(prop_value) + "  </li>\n")
+    parts.append("</ul>\n")
+
+    return RawHtml("".join(parts))
+
+def tableHeader(title):
+    return """<table class="key_value_table">
+    <thead><tr><th colspan="2">""" + encode(title) + """</th></tr></thead>
+    <tbody>
+"""
+
+def tableFooter():
+    return "</tbody></table>"
+
+def formatKeyValueTableRow(key, value, extra_class=""):
+    clazz = ""
+    if isinstance(value, Exception):
+        clazz = "exception"
+
+    if isinstance(value, RawHtml):
+        formatted_value = value.value
+    elif isinstance(value, dict):
+        formatted_value = formatJsonValue(value)
+        clazz += " preformat"
+    else:
+        formatted_value = encode(str(value))
+
+    if isinstance(key, RawHtml):
+        formatted_key = key.value
+    else:
+        formatted_key = encode(str(key))
+
+    return "<tr class='" + extra_class + " " + clazz + "'><td class='key'>" + formatted_key + "</td><td class='value'>" + formatted_value + "</td></tr>\n"
+
+def formatJsonValue(value):
+    return encode(json.dumps(value, sort_keys=True, indent=4))
+
+def formatSettingsKeyTableRow(key, value):
+    clazz = ""
+    if isinstance(value, Exception):
+        clazz = "exception"
+
+    if isinstance(value, RawHtml):
+        formatted_value = value.value
+    else:
+        formatted_value = encode(str(value))
+
+    formatted_key = encode(str(key))
+    return "<tr class='" + clazz + "' --data-key='" + formatted_key + "'><td class='key'>&#x1f511; " + formatted_key + "</td><td class='value'>" + formatted_value + "</td></tr>\n"
+
+##  The key filter works on the KeyIndex of the page (see formatKeyIndex()), not on the rows themselves.
+#
+#   A plain filter text is looked up with the trigram table, a regular expression is only matched against the
+#   distinct keys. Selected facets are looked up per row in a table. The visibility of all rows is then worked out
+#   in an array, and only the rows that change are updated, in one go.
+def keyFilterJS():
+    return """
+    var keyIndex = null;
+    var keyRows = [];
+    var rowVisible = null;
+    var filterTimer = null;
+    var facetRows = {};
+
+    function initKeyFilter() {
+      var keyIndexElement = document.getElementById('key_index');
+      if (keyIndexElement === null) {
+        return;  // A page without the key filter.
+      }
+      keyIndex = JSON.parse(keyIndexElement.textContent);
+      keyRows = new Array(keyIndex.row_count);
+      rowVisible = new Uint8Array(keyIndex.row_count).fill(1);
+      initFacetFilter();
+      // Rows in lazy sections are registered once they are loaded.
+      registerKeyRows(document.querySelector('div.contents'), 0);
+
+      var filter = document.getElementById('key_filter');
+      filter.addEventListener('input', function() {
+        if (filterTimer !== null) {
+          clearTimeout(filterTimer);
+        }
+        filterTimer = setTimeout(function() {
+          filterTimer = null;
+          applyKeyFilter();
+        }, 150);
+      });
+    }
+
+    // Facets only exist on pages with stacks. Every facet gets a lookup table from row id to membership.
+    function initFacetFilter() {
+      var facetNames = Object.keys(keyIndex.facets).sort();
+      if (facetNames.length === 0) {
+        document.getElementById('facet_filter').style.display = 'none';
+        return;
+      }
+      var layerSelect = document.getElementById('facet_layer');
+      var i, j;
+      for (i=0; i<facetNames.length; i++) {
+        var rows = keyIndex.facets[facetNames[i]];
+        var lookup = new Uint8Array(keyIndex.row_count);
+        for (j=0; j<rows.length; j++) {
+          lookup[rows[j]] = 1;
+        }
+        facetRows[facetNames[i]] = lookup;
+
+        if (facetNames[i].indexOf('layer:') === 0) {
+          var option = document.createElement('option');
+          option.value = facetNames[i];
+          option.textContent = facetNames[i].substr(6);
+          layerSelect.appendChild(option);
+        }
+      }
+      layerSelect.addEventListener('change', applyKeyFilter);
+      var checkboxes = document.querySelectorAll('input.facet');
+      for (i=0; i<checkboxes.length; i++) {
+        checkboxes[i].addEventListener('change', applyKeyFilter);
+      }
+    }
+
+    function selectedFacets() {
+      var selected = [];
+      var layer = document.getElementById('facet_layer').value;
+      if (layer !== '') {
+        selected.push(layer);
+      }
+      var checkboxes = document.querySelectorAll('input.facet');
+      var i;
+      for (i=0; i<checkboxes.length; i++) {
+        if (checkboxes[i].checked) {
+          selected.push(checkboxes[i].value);
+        }
+      }
+      var lookups = [];
+      for (i=0; i<selected.length; i++) {
+        // A facet that no row has still has to hide everything.
+        lookups.push(facetRows[selected[i]] || new Uint8Array(keyIndex.row_count));
+      }
+      return lookups;
+    }
+
+    function registerKeyRows(root, firstRow) {
+      var allKeys = root.querySelectorAll('[--data-key]');
+      var i;
+      for (i=0; i<allKeys.length; i++) {
+        keyRows[firstRow + i] = allKeys[i];
+        if (!rowVisible[firstRow + i]) {
+          allKeys[i].classList.add('key_hide');
+        }
+      }
+    }
+
+    function matchingKeys(filterValue) {
+      var keys = keyIndex.keys;
+      var result = [];
+      var i;
+      if (/^[^\\\\^$.|?*+()\\[\\]{}]*$/.test(filterValue)) {
+        var needle = filterValue.toLowerCase();
+        var candidates = candidateKeys(needle);
+        for (i=0; i<candidates.length; i++) {
+          if (keys[candidates[i]].toLowerCase().indexOf(needle) !== -1) {
+            result.push(candidates[i]);
+          }
+        }
+      } else {
+        var filterRegexp;
+        try {
+          filterRegexp = new RegExp(filterValue, 'i');
+        } catch (e) {
+          return null;  // Probably still being typed.
+        }
+        for (i=0; i<keys.length; i++) {
+          if (filterRegexp.test(keys[i])) {
+            result.push(i);
+          }
+        }
+      }
+      return result;
+    }
+
+    // Keys that can contain the (lower case) text: those in the shortest posting list of its trigrams.
+    function candidateKeys(needle) {
+      var i;
+      if (needle.length < 3) {
+        var all = new Array(keyIndex.keys.length);
+        for (i=0; i<all.length; i++) {
+          all[i] = i;
+        }
+        return all;
+      }
+      var best = null;
+      for (i=0; i+3<=needle.length; i++) {
+        var posting = keyIndex.trigrams[needle.substr(i, 3)];
+        if (posting === undefined) {
+          return [];
+        }
+        if (best === null || posting.length < best.length) {
+          best = posting;
+        }
+      }
+      return best;
+    }
+
+    function applyKeyFilter() {
+      var filterValue = document.getElementById('key_filter').value;
+      var facets = selectedFacets();
+      var visible = new Uint8Array(keyIndex.row_count);
+      var i, j;
+      if (filterValue === "" && facets.length === 0) {
+        document.body.classList.add('show_metadata');
+        document.body.classList.remove('hide_metadata');
+        visible.fill(1);
+      } else {
+        var keys = filterValue === "" ? candidateKeys("") : matchingKeys(filterValue);
+        if (keys === null) {
+          return;
+        }
+        document.body.classList.remove('show_metadata');
+        document.body.classList.add('hide_metadata');
+        loadAllLazySections();
+        for (i=0; i<keys.length; i++) {
+          var rows = keyIndex.rows[keys[i]];
+          for (j=0; j<rows.length; j++) {
+            visible[rows[j]] = 1;
+          }
+        }
+        for (i=0; i<facets.length; i++) {
+          var lookup = facets[i];
+          for (j=0; j<visible.length; j++) {
+            visible[j] &= lookup[j];
+          }
+        }
+      }
+
+      window.requestAnimationFrame(function() {
+        for (i=0; i<visible.length; i++) {
+          if (visible[i] !== rowVisible[i]) {
+            rowVisible[i] = visible[i];
+            if (keyRows[i] !== undefined) {
+              keyRows[i].classList.toggle('key_hide', !visible[i]);
+            }
+          }
+        }
+      });
+    }
+    """
+
+def lazySectionsJS():
+    return """
+    var lazySectionObserver = null;
+
+    function initLazySections() {
+      if (!('IntersectionObserver' in window)) {
+        return;
+      }
+      lazySectionObserver = new IntersectionObserver(function(entries) {
+        var i;
+        for (i=0; i<entries.length; i++) {
+          if (entries[i].isIntersecting) {
+            loadLazySection(entries[i].target);
+          }
+        }
+      }, {rootMargin: '500px'});
+
+      var sections = document.querySelectorAll('div.lazy_keys');
+      var i;
+      for (i=0; i<sections.length; i++) {
+        lazySectionObserver.observe(sections[i]);
+      }
+    }
+
+    // Fragments are plain scripts instead of fetch()ed files, because browsers refuse to fetch file:// URLs.
+    function loadLazySection(section) {
+      if (section.hasAttribute('data-state')) {
+        return;
+      }
+      section.setAttribute('data-state', 'loading');
+      if (lazySectionObserver !== null) {
+        lazySectionObserver.unobserve(section);
+      }
+      var script = document.createElement('script');
+      script.src = section.getAttribute('data-src');
+      document.head.appendChild(script);
+    }
+
+    function loadAllLazySections() {
+      var sections = document.querySelectorAll('div.lazy_keys:not([data-state])');
+      var i;
+      for (i=0; i<sections.length; i++) {
+        loadLazySection(sections[i]);
+      }
+    }
+
+    function lazyKeysLoaded(anchor, html) {
+      var section = document.getElementById('keys_' + anchor);
+      section.innerHTML = html;
+      section.setAttribute('data-state', 'loaded');
+      registerKeyRows(section, parseInt(section.getAttribute('data-first-row'), 10));
+    }
+    """
+
+def formatKeyIndex(key_index):
+    return "<script type='application/json' id='key_index'>" + key_index.toJson() + "</script>\n"
+
+def keyFilterWidget():
+    html = """
+    <div class='key_filter'>
+    &#x1f511; filter regex: <input type='text' id='key_filter' />
+    <div class='facet_filter' id='facet_filter'>
+    supplied by: <select id='facet_layer'><option value=''>any container</option></select><br />
+    <label><input type='checkbox' class='facet' value='overridden' /> overridden</label>
+    <label><input type='checkbox' class='facet' value='expression' /> expression</label>
+    <label><input type='checkbox' class='facet' value='resolve' /> has resolve</label>
+    <label><input type='checkbox' class='facet' value='disabled' /> disabled</label>
+    </div>
+    </div>
+    """
+    return html
+
+def liveReportJS():
+    return """
+    function initLiveReport() {
+      var events = new EventSource('events');
+      events.addEventListener('rows', function(event) {
+        var rows = JSON.parse(event.data);
+        var i;
+        for (i=0; i<rows.length; i++) {
+          replaceLiveRow(rows[i].anchor, rows[i].key, rows[i].html);
+        }
+      });
+      events.addEventListener('reload', function() {
+        window.location.reload();
+      });
+    }
+
+    // A container can be in the page more than once, so all its tables are updated.
+    function replaceLiveRow(anchor, key, html) {
+      var anchors = document.querySelectorAll("a[id='" + anchor + "']");
+      var i;
+      for (i=0; i<anchors.length; i++) {
+        var table = anchors[i].nextElementSibling;
+        var oldRow = table === null ? null : table.querySelector("tr[--data-key='" + CSS.escape(key) + "']");
+        if (oldRow === null) {
+          continue;
+        }
+        var tbody = document.createElement('tbody');
+        tbody.innerHTML = html;
+        var newRow = tbody.firstElementChild;
+        oldRow.replaceWith(newRow);
+
+        var rowId = keyRows.indexOf(oldRow);
+        if (rowId !== -1) {
+          keyRows[rowId] = newRow;
+          newRow.classList.toggle('key_hide', !rowVisible[rowId]);
+        }
+      }
+    }
+
+    window.addEventListener('load', initLiveReport);
+    """
+
+##  Put a table with the timings of an Instrumentation before the last chunk of a page, which closes the page.
+def withInstrumentationSummary(html_chunks, instrumentation):
+    last_chunk = None
+    for chunk in html_chunks:
+        if last_chunk is not None:
+            yield last_chunk
+        last_chunk = chunk
+    if last_chunk is not None:
+        yield instrumentationSummaryHtml(instrumentation)
+        yield last_chunk
+
+def instrumentationSummaryHtml(instrumentation):
+    parts = ["<details class='instrumentation' style='position: relative; margin-left: 25em; padding: 4px; background-color: #ffffff;'>"]
+    parts.append("<summary>Report timings (" + "%.1f" % (instrumentation.elapsed() * 1e3) + " ms until this table)</summary>\n")
+    parts.append("<table class='key_value_table'><thead><tr><th>Stage</th><th>Calls</th><th>Total ms</th><th>Per call &micro;s</th></tr></thead><tbody>\n")
+    for stage, calls, seconds in instrumentation.summary():
+        parts.append("<tr><td class='key'>" + encode(stage) + "</td><td>" + str(calls) + "</td><td>" + "%.1f" % (seconds * 1e3) + "</td><td>" + "%.2f" % (seconds * 1e6 / calls) + "</td></tr>\n")
+    parts.append("</tbody></table>\n<p>Times include the stages called from them.</p>\n")
+    profile_text = instrumentation.profileText()
+    if profile_text:
+        parts.append("<pre>" + encode(profile_text) + "</pre>\n")
+    parts.append("</details>\n")
+    return "".join(parts)
+
+# def formatContainerInstance(container_instance):
+#     return """
+#
+# """
+
+
+htmlFooter = """</body>
+</html>
+"""
+class RawHtml:
+    def __init__(self, value):
+        self.value = value
@@ -0,0 +1,105 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+from UM.Application import Application
+from UM.Job import Job
+from UM.Logger import Logger
+from UM.Message import Message
+
+try:
+    from PyQt6.QtCore import QUrl
+    from PyQt6.QtGui import QDesktopServices
+except:
+    from PyQt5.QtCore import QUrl
+    from PyQt5.QtGui import QDesktopServices
+
+from .Instrumentation import endInstrumentation
+from .ReportFormat import withInstrumentationSummary
+from .ReportWriter import writeHtmlPage
+
+import os
+
+
+##  Writes a report page on a worker thread and opens it in the browser once it is complete.
+#
+#   The page chunks must be rendered from snapshots (see SnapshotBuilder), never from live containers. If the job
+#   gets an Instrumentation, its timings are put at the end of the page and logged, and it is ended with the job.
+#   With compress, the page is stored gzip compressed (see ReportWriter.writeHtmlPage()).
+class ReportJob(Job):
+    # Number of chunks each page had the last time it was written, used to estimate the progress.
+    _chunk_counts = {}
+
+    def __init__(self, target, html_chunks, title, instrumentation=None, compress=False):
+        super().__init__()
+        self._target = target
+        self._html_chunks = html_chunks
+        self._instrumentation = instrumentation
+        self._compress = compress
+        self._abort_requested = False
+        self._expected_chunks = self._chunk_counts.get(os.path.basename(target))
+
+        self._message = Message("Writing " + os.path.basename(target), lifetime=0, dismissable=False,
+                                progress=-1 if self._expected_chunks is None else 0, title=title)
+        self._message.addAction("cancel", "Cancel", "", "")
+        self._message.actionTriggered.connect(self._onMessageActionTriggered)
+
+    def abort(self):
+        self._abort_requested = True
+
+    def run(self):
+        self._message.show()
+        try:
+            if self._instrumentation is None:
+                written = writeHtmlPage(self._target, self._countedChunks(), compress=self._compress)
+            else:
+                written = self._writeInstrumented()
+        except _ReportCancelled:
+            # The writer leaves the previous version of the page as it was.
+            self._message.hide()
+            return
+        except Exception:
+            Logger.logException("e", "Failed to write %s", self._target)
+            self._message.hide()
+            return
+        finally:
+            if self._instrumentation is not None:
+                endInstrumentation(self._instrumentation)
+
+        self._message.hide()
+        if self._abort_requested:
+            return
+
+        if not written:
+            Logger.log("d", "%s didn't change, opening the page that was already written.", os.path.basename(self._target))
+        self._chunk_counts[os.path.basename(self._target)] = self._chunk_count
+        self.setResult(self._target)
+        Application.getInstance().callLater(QDesktopServices.openUrl, QUrl.fromLocalFile(self._target))
+
+    def _writeInstrumented(self):
+        instrumentation = self._instrumentation
+        with instrumentation.measure("render and write page"), instrumentation.profiling():
+            written = writeHtmlPage(self._target, withInstrumentationSummary(self._countedChunks(), instrumentation), instrumentation,
+                                    compress=self._compress)
+        Logger.log("d", "Timings of %s:\n%s", os.path.basename(self._target), instrumentation.summaryText())
+        profile_text = instrumentation.profileText()
+        if profile_text:
+            Logger.log("d", "Profile of %s:\n%s", os.path.basename(self._target), profile_text)
+        return written
+
+    def _countedChunks(self):
+        self._chunk_count = 0
+        for chunk in self._html_chunks:
+            if self._abort_requested:
+                raise _ReportCancelled()
+            self._chunk_count += 1
+            if self._expected_chunks and self._chunk_count % 256 == 0:
+                self._message.setProgress(min(100, 100 * self._chunk_count // self._expected_chunks))
+            yield chunk
+
+    def _onMessageActionTriggered(self, message, action):
+        if action == "cancel":
+            self.abort()
+            self._message.hide()
+
+##  Raised from the chunks of a page when the job is cancelled, so the page is not written.
+class _ReportCancelled(Exception):
+    pass
@@ -0,0 +1,186 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import base64
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+import urllib.parse
+import zlib
+
+WRITE_BUFFER_SIZE = 256 * 1024
+COMPRESSION_LEVEL = 6
+TARGET_MODE = 0o644
+
+# Stands in for a compressed page, see _writeCompressedPage(). Pages are opened from file:// URLs, so the page data is
+# loaded as a script (see writeScriptCall()), and the browser decompresses it and replaces this page with it.
+compressed_page_wrapper = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>Loading report</title>
+<script>
+function compressedPageLoaded(data) {
+    var bytes = Uint8Array.from(atob(data), function (character) { return character.charCodeAt(0); });
+    var page = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    new Response(page).text().then(function (html) {
+        document.open();
+        document.write(html);
+        document.close();
+    });
+}
+</script>
+<script src="%s"></script>
+</head>
+<body>Loading report...</body>
+</html>
+"""
+
+##  Write a page to disk chunk by chunk, unless it is the same as the page that is already there.
+#
+#   The chunks are compared with the previous version of the page while they are produced, and nothing is written
+#   until they differ. A page that didn't change is left alone, so opening the same report again costs no writes.
+#   A changed page is written to a temporary file that replaces the page once it is complete.
+#   \param html_chunks An iterable of strings, typically one of the page generators in GodMode. Chunks are written
+#   as they are produced so the complete page never has to exist in memory at once.
+#   \param instrumentation If given, the time spent writing is added to it as the "write" stage.
+#   \param compress Store the page gzip compressed, see _writeCompressedPage().
+#   \return True if the page was written, False if the page on disk was already the same.
+def writeHtmlPage(target, html_chunks, instrumentation=None, compress=False):
+    write = _writeCompressedPage if compress else _writePageIfChanged
+    if instrumentation is None:
+        return write(target, html_chunks)
+
+    timed_chunks = _TimedChunks(html_chunks)
+    start = time.perf_counter()
+    written = write(target, timed_chunks)
+    write_time = time.perf_counter() - start - timed_chunks.seconds
+    instrumentation.add("write" if written else "write (unchanged, skipped)", write_time, timed_chunks.count)
+    return written
+
+def _writePageIfChanged(target, html_chunks):
+    try:
+        previous = open(target, "rb", buffering=WRITE_BUFFER_SIZE)
+    except OSError:
+        previous = None
+    fhandle = None
+    temporary_target = None
+    same_bytes = 0  # Length of the start of the page that is the same in the previous version.
+    try:
+        for chunk in html_chunks:
+            data = chunk.encode("utf-8")
+            if fhandle is None:
+                if previous is not None and previous.read(len(data)) == data:
+                    same_bytes += len(data)
+                    continue
+                fhandle, temporary_target = _startWrite(target, previous, same_bytes)
+            fhandle.write(data)
+        if fhandle is None:
+            if previous is not None and not previous.read(1):
+                return False
+            fhandle, temporary_target = _startWrite(target, previous, same_bytes)
+        fhandle.close()
+    except:
+        if fhandle is not None:
+            fhandle.close()
+            os.remove(temporary_target)
+        raise
+    finally:
+        if previous is not None:
+            previous.close()
+    os.replace(temporary_target, target)
+    return True
+
+##  Open a temporary file for a changed page, starting with the part that was the same as the previous version.
+#
+#   The temporary file has a unique name next to the target, so jobs that write the same page at the same time don't
+#   write into each other's file.
+#   \return (file, path of the file)
+def _startWrite(target, previous, same_bytes):
+    descriptor, temporary_target = tempfile.mkstemp(dir=os.path.dirname(target) or ".", prefix=os.path.basename(target) + ".", suffix=".tmp")
+    os.chmod(temporary_target, TARGET_MODE)  # mkstemp() makes files that only the owner can read.
+    fhandle = os.fdopen(descriptor, "wb", buffering=WRITE_BUFFER_SIZE)
+    if same_bytes:
+        previous.seek(0)
+        while same_bytes:
+            block = previous.read(min(same_bytes, WRITE_BUFFER_SIZE))
+            if not block:
+                break
+            fhandle.write(block)
+            same_bytes -= len(block)
+    return fhandle, temporary_target
+
+##  Store the page gzip compressed, in a script named after a digest of the page, and write a small page at the
+#   target that loads the script and shows the decompressed page.
+#
+#   The page is compressed and hashed while its chunks are produced. Only the compressed page is kept in memory,
+#   and it is only written if there is no script with the same digest yet. Scripts of previous versions of the page
+#   are removed.
+def _writeCompressedPage(target, html_chunks):
+    digest = hashlib.blake2b(digest_size=16)
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16 + for a gzip header.
+    compressed = []
+    for chunk in html_chunks:
+        data = chunk.encode("utf-8")
+        digest.update(data)
+        compressed.append(compressor.compress(data))
+    compressed.append(compressor.flush())
+
+    base_path = os.path.splitext(target)[0]
+    data_path = base_path + "_" + digest.hexdigest() + ".gz.js"
+    written = False
+    if not os.path.exists(data_path):
+        written = writeScriptCall(data_path, "compressedPageLoaded", base64.b64encode(b"".join(compressed)).decode("ascii"))
+    for old_data_path in glob.glob(glob.escape(base_path) + "_" + "[0-9a-f]" * 32 + ".gz.js"):
+        if old_data_path != data_path:
+            _removeIfExists(old_data_path)
+
+    wrapper = compressed_page_wrapper % urllib.parse.quote(os.path.basename(data_path))
+    return _writePageIfChanged(target, [wrapper]) or written
+
+##  Passes the chunks of a page through, keeping track of the time it takes to produce them.
+class _TimedChunks:
+    def __init__(self, html_chunks):
+        self._html_chunks = html_chunks
+        self.seconds = 0.0
+        self.count = 0
+
+    def __iter__(self):
+        chunks = iter(self._html_chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            self.seconds += time.perf_counter() - start
+            if chunk is None:
+                return
+            self.count += 1
+            yield chunk
+
+##  Create a directory for the fragments of a page, removing the fragments of a previous version of the page that
+#   are not part of the new version. Fragments that are part of both are left for writeScriptCall() to compare.
+#   \param fragment_names The file names of the fragments of the new version of the page.
+def prepareFragmentDirectory(fragment_dir, fragment_names):
+    os.makedirs(fragment_dir, exist_ok=True)
+    fragment_names = set(fragment_names)
+    for old_fragment in glob.glob(os.path.join(glob.escape(fragment_dir), "*.js")):
+        if os.path.basename(old_fragment) not in fragment_names:
+            _removeIfExists(old_fragment)
+
+##  Write a script that calls a function of the page with the given (JSON serializable) arguments, unless the same
+#   script was already written.
+#
+#   Pages are opened from file:// URLs, where browsers block fetch(), but still load scripts. This is how pages
+#   load data that is not part of the page itself.
+#   \return True if the script was written, False if it was already the same.
+def writeScriptCall(target, function_name, *args):
+    return _writePageIfChanged(target, [function_name + "(" + ", ".join(json.dumps(arg) for arg in args) + ");\n"])
+
+##  Remove a file, that another job writing the same page may already have removed.
+def _removeIfExists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
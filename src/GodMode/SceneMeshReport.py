@@ -0,0 +1,176 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+from .ReportFormat import encode, getHtmlHeader, htmlFooter
+
+import hashlib
+
+import numpy
+
+# The scene meshes report is made from SceneNodeSnapshots only, so like ReportFormat this module doesn't need Cura.
+
+##  A page with the size of the mesh buffers of every scene node, and which of them are shared or duplicated.
+#
+#   Buffers of different nodes that are the same memory are shared, and only use memory once. Buffers that are
+#   different memory with the same contents are duplicates, that could have been shared.
+#   \param nodes List of SceneNodeSnapshots, in depth first order.
+def sceneMeshesHtmlPage(nodes):
+    yield getHtmlHeader("Scene Meshes")
+
+    statistics = [meshStatistics(node) if node.hasMesh() else None for node in nodes]
+    sharing = [None] * len(nodes)
+    totals = _MeshTotals()
+    group_totals = {node.anchor: _MeshTotals() for node in nodes if node.is_group}
+    parents = {node.anchor: node.parent_anchor for node in nodes}
+
+    mesh_owners = {}  # Mesh id -> name of the first node with the mesh.
+    memory_owners = {}  # (address, size) -> name of the first node with the buffer.
+    content_owners = {}  # Digest -> name of the first node with the contents.
+    for position, (node, node_statistics) in enumerate(zip(nodes, statistics)):
+        if node_statistics is None:
+            continue
+        shared_bytes = 0
+        duplicate_bytes = 0
+        notes = []
+        if node.mesh_id in mesh_owners:
+            notes.append("Same MeshData as " + mesh_owners[node.mesh_id])
+        mesh_owners.setdefault(node.mesh_id, node.name)
+        for name, buffer in node_statistics["buffers"].items():
+            if buffer["memory"] in memory_owners:
+                shared_bytes += buffer["bytes"]
+                if not notes:
+                    notes.append("Shares " + name + " with " + memory_owners[buffer["memory"]])
+            elif buffer["digest"] in content_owners:
+                duplicate_bytes += buffer["bytes"]
+                notes.append("Copy of the " + name + " of " + content_owners[buffer["digest"]])
+            memory_owners.setdefault(buffer["memory"], node.name)
+            content_owners.setdefault(buffer["digest"], node.name)
+        sharing[position] = (shared_bytes, duplicate_bytes, notes)
+
+        totals.add(node_statistics, shared_bytes, duplicate_bytes)
+        parent_anchor = node.parent_anchor
+        while parent_anchor is not None:
+            if parent_anchor in group_totals:
+                group_totals[parent_anchor].add(node_statistics, shared_bytes, duplicate_bytes)
+            parent_anchor = parents.get(parent_anchor)
+
+    yield "<div class='menu'>\n"
+    yield "<ul>"
+    yield "<li><a href='#scene_totals'>Totals</a></li>\n"
+    if group_totals:
+        yield "<li><a href='#group_totals'>Groups</a></li>\n"
+    yield "<li><a href='#scene_nodes'>Nodes</a></li>\n"
+    yield "</ul>\n"
+    yield "</div>"
+
+    yield "<div class='contents'>"
+    yield "<h2 id='scene_totals'>Totals</h2>"
+    yield "<table class='key_value_table'>\n<tbody>\n"
+    yield _totalsRow("Nodes with a mesh", str(totals.nodes))
+    yield _totalsRow("Vertices", str(totals.vertices))
+    yield _totalsRow("Triangles", str(totals.triangles))
+    yield _totalsRow("Buffer memory", formatBytes(totals.bytes))
+    yield _totalsRow("Shared between nodes (counted once above)", formatBytes(totals.shared_bytes))
+    yield _totalsRow("Duplicates that could be shared", formatBytes(totals.duplicate_bytes))
+    yield "</tbody></table>\n"
+    yield "<p>Memory that nodes share is counted for the first node that uses it.</p>\n"
+
+    if group_totals:
+        yield "<h2 id='group_totals'>Groups</h2>"
+        yield "<table class='key_value_table mesh_table'>\n"
+        yield "<thead><tr><th>Group</th><th>Nodes</th><th>Vertices</th><th>Triangles</th><th>Memory</th><th>Duplicates</th></tr></thead>\n<tbody>\n"
+        for node in nodes:
+            if node.is_group:
+                group = group_totals[node.anchor]
+                yield ("<tr><td class='key'><a href='#" + node.anchor + "'>" + encode(node.name) + "</a></td><td>" + str(group.nodes) + "</td><td>" +
+                       str(group.vertices) + "</td><td>" + str(group.triangles) + "</td><td>" + formatBytes(group.bytes) + "</td><td>" +
+                       formatBytes(group.duplicate_bytes) + "</td></tr>\n")
+        yield "</tbody></table>\n"
+
+    yield "<h2 id='scene_nodes'>Nodes</h2>"
+    yield "<table class='key_value_table mesh_table'>\n"
+    yield "<thead><tr><th>Node</th><th>Vertices</th><th>Triangles</th><th>Size (mm)</th><th>Buffers</th><th>Memory</th><th>Shared</th></tr></thead>\n<tbody>\n"
+    for node, node_statistics, node_sharing in zip(nodes, statistics, sharing):
+        yield formatSceneNodeRow(node, node_statistics, node_sharing)
+    yield "</tbody></table>\n"
+    yield "</div>"
+
+    yield htmlFooter
+
+def formatSceneNodeRow(node, statistics, sharing):
+    label = "&nbsp;" * 4 * max(node.depth - 1, 0) + encode(node.name or "(unnamed)")
+    if node.is_group:
+        label += " (group)"
+    cells = ["<a id='" + node.anchor + "'></a>" + label]
+    if statistics is None:
+        cells += [""] * 6
+    else:
+        shared_bytes, duplicate_bytes, notes = sharing
+        size = statistics["size"]
+        cells.append(str(statistics["vertices"]))
+        cells.append(str(statistics["triangles"]))
+        cells.append(" &times; ".join("%.1f" % value for value in size) if size is not None else "")
+        cells.append("<br>".join(encode(name) + ": " + str(buffer["count"]) + " &times; " + encode(buffer["item"]) + ", " + formatBytes(buffer["bytes"])
+                                 for name, buffer in statistics["buffers"].items()))
+        cells.append(formatBytes(statistics["bytes"]))
+        cells.append("<br>".join(encode(note) for note in notes))
+    row_class = "duplicate" if statistics is not None and sharing[1] else ""
+    return "<tr class='" + row_class + "'><td class='key'>" + "</td><td>".join(cells) + "</td></tr>\n"
+
+##  The numbers of the mesh of one node.
+def meshStatistics(node):
+    buffers = {name: bufferStatistics(array) for name, array in node.buffers.items()}
+    vertices = node.buffers.get("vertices")
+    indices = node.buffers.get("indices")
+    vertex_count = len(vertices) if vertices is not None else 0
+    size = None
+    if vertex_count:
+        size = (vertices.max(axis=0) - vertices.min(axis=0)).tolist()
+    return {
+        "buffers": buffers,
+        "vertices": vertex_count,
+        "triangles": len(indices) if indices is not None else vertex_count // 3,
+        "size": size,
+        "bytes": sum(buffer["bytes"] for buffer in buffers.values())
+    }
+
+##  The numbers of one numpy buffer of a mesh, with what is needed to find shared and duplicate buffers: the memory
+#   it uses, and a digest of its contents.
+def bufferStatistics(array):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update((str(array.dtype) + str(array.shape)).encode("utf-8"))
+    digest.update(numpy.ascontiguousarray(array).data)
+    return {
+        "count": len(array),
+        "item": str(array.dtype) + ("[" + "x".join(str(size) for size in array.shape[1:]) + "]" if array.ndim > 1 else ""),
+        "bytes": array.nbytes,
+        "memory": (array.__array_interface__["data"][0], array.nbytes),
+        "digest": digest.digest()
+    }
+
+def formatBytes(size):
+    for unit in ("bytes", "kB", "MB"):
+        if size < 1024:
+            return ("%d " if unit == "bytes" else "%.1f ") % size + unit
+        size /= 1024
+    return "%.1f GB" % size
+
+def _totalsRow(key, value):
+    return "<tr><td class='key'>" + encode(key) + "</td><td class='value'>" + value + "</td></tr>\n"
+
+class _MeshTotals:
+    def __init__(self):
+        self.nodes = 0
+        self.vertices = 0
+        self.triangles = 0
+        self.bytes = 0
+        self.shared_bytes = 0
+        self.duplicate_bytes = 0
+
+    def add(self, statistics, shared_bytes, duplicate_bytes):
+        self.nodes += 1
+        self.vertices += statistics["vertices"]
+        self.triangles += statistics["triangles"]
+        # Memory that is shared with an earlier node is already counted there.
+        self.bytes += statistics["bytes"] - shared_bytes
+        self.shared_bytes += shared_bytes
+        self.duplicate_bytes += duplicate_bytes
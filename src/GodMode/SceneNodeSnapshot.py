@@ -0,0 +1,24 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+
+##  Plain data copy of a scene node, for the scene meshes report.
+#
+#   The buffers are the numpy arrays of the node's MeshData itself, not copies. MeshData is not changed once it is
+#   made (a node gets a new MeshData instead), so the arrays can be read on a worker thread.
+class SceneNodeSnapshot:
+    def __init__(self, anchor, name, depth, is_group, parent_anchor, mesh_id=None, buffers=None):
+        # Unique id of the live node, used for the links in the report.
+        self.anchor = anchor
+        self.name = name
+        self.depth = depth
+        self.is_group = is_group
+        # Anchor of the parent node, None for the root.
+        self.parent_anchor = parent_anchor
+        # Identity of the node's MeshData, None if the node has no mesh.
+        self.mesh_id = mesh_id
+        # Buffer name ("vertices", "indices", ...) -> numpy array.
+        self.buffers = buffers or {}
+
+    def hasMesh(self):
+        return self.mesh_id is not None
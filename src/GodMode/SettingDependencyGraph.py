@@ -0,0 +1,116 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import json
+
+
+##  Which settings the setting functions of the active stacks use, and how long the values took to evaluate.
+#
+#   Plain data, made on the main thread by SnapshotBuilder.settingDependencyGraph(), so the analysis and the report
+#   can run on a worker thread. An edge from a key to a dependency means that a function of the key (its value,
+#   minimum value, enabled, ...) uses the dependency.
+class SettingDependencyGraph:
+    def __init__(self):
+        # Key -> {dependency key -> sorted list of the properties whose functions use it}.
+        self.dependencies = {}
+        # Names of the stacks that were timed, in order.
+        self.stack_names = []
+        # Stack name -> {key -> seconds to evaluate the value of the key through the stack}.
+        self.evaluation_times = {}
+
+    def addKey(self, key):
+        self.dependencies.setdefault(key, {})
+
+    def addDependencies(self, key, prop_name, used_keys):
+        dependencies = self.dependencies.setdefault(key, {})
+        for used_key in used_keys:
+            if used_key == key:
+                continue
+            prop_names = dependencies.setdefault(used_key, [])
+            if prop_name not in prop_names:
+                prop_names.append(prop_name)
+                prop_names.sort()
+            self.dependencies.setdefault(used_key, {})
+
+    def addEvaluationTime(self, stack_name, key, seconds):
+        if stack_name not in self.evaluation_times:
+            self.stack_names.append(stack_name)
+            self.evaluation_times[stack_name] = {}
+        self.evaluation_times[stack_name][key] = seconds
+
+    def totalEvaluationTime(self, key):
+        return sum(times.get(key, 0.0) for times in self.evaluation_times.values())
+
+    ##  Key -> sorted list of the keys that use it directly.
+    def dependents(self):
+        dependents = {key: [] for key in self.dependencies}
+        for key, dependencies in self.dependencies.items():
+            for dependency in dependencies:
+                dependents[dependency].append(key)
+        for keys in dependents.values():
+            keys.sort()
+        return dependents
+
+    ##  Key -> number of keys that use it, directly or through other keys. These all have to be evaluated again when
+    #   the key changes.
+    def transitiveDependentCounts(self):
+        dependents = self.dependents()
+        counts = {}
+        for key in self.dependencies:
+            seen = {key}
+            pending = [key]
+            while pending:
+                for dependent in dependents[pending.pop()]:
+                    if dependent not in seen:
+                        seen.add(dependent)
+                        pending.append(dependent)
+            counts[key] = len(seen) - 1
+        return counts
+
+    ##  The longest chains of keys that use each other, as lists from the key that uses to the key that is used.
+    #   Cycles are cut where they close.
+    #   \param count The number of chains, each starting at a different key.
+    def longestChains(self, count):
+        longest = {}  # Key -> longest chain starting at the key.
+
+        for start in sorted(self.dependencies):
+            if start in longest:
+                continue
+            # Depth first, without recursion: the chains can be longer than the recursion limit.
+            on_path = {start}
+            stack = [(start, iter(sorted(self.dependencies[start])))]
+            while stack:
+                key, dependencies = stack[-1]
+                dependency = next(dependencies, None)
+                if dependency is None:
+                    stack.pop()
+                    on_path.discard(key)
+                    chains = [longest[dependency] for dependency in self.dependencies[key] if dependency in longest]
+                    longest[key] = [key] + max(chains, key=len, default=[])
+                elif dependency not in longest and dependency not in on_path:
+                    on_path.add(dependency)
+                    stack.append((dependency, iter(sorted(self.dependencies[dependency]))))
+
+        return sorted(longest.values(), key=lambda chain: (-len(chain), chain[0]))[:count]
+
+    ##  The graph and the evaluation times as JSON, in chunks.
+    def jsonChunks(self):
+        yield "{\"stacks\": " + json.dumps(self.stack_names) + ",\n\"keys\": {\n"
+        for position, key in enumerate(sorted(self.dependencies)):
+            record = {
+                "dependencies": self.dependencies[key],
+                "evaluation_seconds": {stack_name: self.evaluation_times[stack_name][key] for stack_name in self.stack_names if key in self.evaluation_times[stack_name]}
+            }
+            yield ("," if position else "") + json.dumps(key) + ": " + json.dumps(record, sort_keys=True) + "\n"
+        yield "}}\n"
+
+    ##  The graph in the Graphviz DOT format, in chunks. Edges point from a key to the keys it uses.
+    def dotChunks(self):
+        yield "digraph setting_dependencies {\n  rankdir=LR;\n  node [shape=box];\n"
+        for key in sorted(self.dependencies):
+            milliseconds = self.totalEvaluationTime(key) * 1e3
+            yield "  " + json.dumps(key) + " [tooltip=" + json.dumps("%.3f ms" % milliseconds) + "];\n"
+        for key in sorted(self.dependencies):
+            for dependency, prop_names in sorted(self.dependencies[key].items()):
+                yield "  " + json.dumps(key) + " -> " + json.dumps(dependency) + " [label=" + json.dumps(", ".join(prop_names)) + "];\n"
+        yield "}\n"
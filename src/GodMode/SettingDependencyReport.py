@@ -0,0 +1,88 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+from .ReportFormat import encode, getHtmlHeader, htmlFooter
+from .ReportWriter import writeHtmlPage
+
+import os.path
+
+# Number of rows in the tables of the most expensive keys and the keys with the most dependents.
+TOP_KEYS = 50
+# Number of dependency chains that are shown.
+TOP_CHAINS = 20
+
+##  A page with the keys that take the longest to evaluate, the keys that most other keys depend on, and the longest
+#   chains of dependencies, from a SettingDependencyGraph.
+#
+#   The whole graph is also written as JSON and as a Graphviz DOT file, next to the page.
+#   \param export_path Path of the exported graph, without extension.
+def settingDependenciesHtmlPage(graph, export_path):
+    writeHtmlPage(export_path + ".json", graph.jsonChunks())
+    writeHtmlPage(export_path + ".dot", graph.dotChunks())
+
+    yield getHtmlHeader("Setting Dependencies")
+
+    yield "<div class='menu'>\n"
+    yield "<ul>"
+    yield "<li><a href='#dependency_summary'>Summary</a></li>\n"
+    yield "<li><a href='#expensive_keys'>Most Expensive Keys</a></li>\n"
+    yield "<li><a href='#dependent_keys'>Most Dependents</a></li>\n"
+    yield "<li><a href='#dependency_chains'>Longest Chains</a></li>\n"
+    yield "</ul>\n"
+    yield "</div>"
+
+    dependents = graph.dependents()
+    dependent_counts = graph.transitiveDependentCounts()
+    total_times = {key: graph.totalEvaluationTime(key) for key in graph.dependencies}
+
+    yield "<div class='contents'>"
+    yield "<h2 id='dependency_summary'>Summary</h2>"
+    yield "<table class='key_value_table'>\n<tbody>\n"
+    yield _summaryRow("Keys", str(len(graph.dependencies)))
+    yield _summaryRow("Keys with setting functions", str(sum(1 for dependencies in graph.dependencies.values() if dependencies)))
+    yield _summaryRow("Dependencies", str(sum(len(dependencies) for dependencies in graph.dependencies.values())))
+    for stack_name in graph.stack_names:
+        yield _summaryRow("Evaluating all values of " + stack_name, "%.1f ms" % (sum(graph.evaluation_times[stack_name].values()) * 1e3))
+    base_name = os.path.basename(export_path)
+    yield _summaryRow("Export", "<a href='" + encode(base_name) + ".json'>JSON</a>, <a href='" + encode(base_name) + ".dot'>DOT</a>")
+    yield "</tbody></table>\n"
+    yield "<p>Evaluation times are the fastest of a few evaluations, and include the keys that a value uses.</p>\n"
+
+    yield "<h2 id='expensive_keys'>Most Expensive Keys</h2>"
+    yield "<table class='key_value_table dependency_table'>\n"
+    yield "<thead><tr><th>Key</th>" + "".join("<th>" + encode(stack_name) + " (ms)</th>" for stack_name in graph.stack_names) + "<th>Uses</th><th>Used by</th></tr></thead>\n<tbody>\n"
+    for key in sorted(total_times, key=lambda key: (-total_times[key], key))[:TOP_KEYS]:
+        cells = ["%.3f" % (graph.evaluation_times[stack_name].get(key, 0.0) * 1e3) for stack_name in graph.stack_names]
+        cells.append(_keyList(sorted(graph.dependencies[key])))
+        cells.append(str(dependent_counts[key]))
+        yield _keyRow(key, cells)
+    yield "</tbody></table>\n"
+
+    yield "<h2 id='dependent_keys'>Most Dependents</h2>"
+    yield "<table class='key_value_table dependency_table'>\n"
+    yield "<thead><tr><th>Key</th><th>Used by (all)</th><th>Used directly by</th></tr></thead>\n<tbody>\n"
+    for key in sorted(dependent_counts, key=lambda key: (-dependent_counts[key], key))[:TOP_KEYS]:
+        if not dependent_counts[key]:
+            break
+        yield _keyRow(key, [str(dependent_counts[key]), _keyList(dependents[key])])
+    yield "</tbody></table>\n"
+
+    yield "<h2 id='dependency_chains'>Longest Chains</h2>"
+    yield "<table class='key_value_table dependency_table'>\n"
+    yield "<thead><tr><th>Key</th><th>Length</th><th>Uses, through each other</th></tr></thead>\n<tbody>\n"
+    for chain in graph.longestChains(TOP_CHAINS):
+        if len(chain) < 2:
+            break
+        yield _keyRow(chain[0], [str(len(chain) - 1), " &rarr; ".join(encode(key) for key in chain[1:])])
+    yield "</tbody></table>\n"
+    yield "</div>"
+
+    yield htmlFooter
+
+def _summaryRow(key, value):
+    return "<tr><td class='key'>" + encode(key) + "</td><td class='value'>" + value + "</td></tr>\n"
+
+def _keyRow(key, cells):
+    return "<tr><td class='key'>&#x1f511; " + encode(key) + "</td><td>" + "</td><td>".join(cells) + "</td></tr>\n"
+
+def _keyList(keys):
+    return ", ".join(encode(key) for key in keys)
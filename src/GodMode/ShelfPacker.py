@@ -0,0 +1,84 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+SHELF_HEIGHT_STEP = 8  # Shelf heights are rounded up to this, so shelves fit more than one exact label height.
+
+
+##  Packs rectangles into an area of a fixed size, on shelves: rows of rectangles of about the same height.
+#
+#   Freed slots are reused for rectangles that fit in them. Once all slots are free, the whole area is used again
+#   from the start.
+class ShelfPacker:
+    def __init__(self, width, height):
+        self._width = width
+        self._height = height
+        self.reset()
+
+    def reset(self):
+        self._shelves = []  # [y, height, x of the free space]
+        self._free_slots = []
+        self._used_slots = 0
+
+    def isEmpty(self):
+        return self._used_slots == 0
+
+    ##  Find a place for a rectangle.
+    #   \return The slot (x, y, width, height) that was reserved, which can be bigger than the rectangle, or None if
+    #   there is no room.
+    def allocate(self, width, height):
+        if width > self._width or height > self._height:
+            return None
+
+        slot = self._reuseFreeSlot(width, height)
+        if slot is None:
+            slot = self._allocateOnShelf(width, height)
+        if slot is not None:
+            self._used_slots += 1
+        return slot
+
+    def free(self, slot):
+        self._used_slots -= 1
+        if self._used_slots == 0:
+            self.reset()
+        else:
+            self._free_slots.append(slot)
+
+    def _reuseFreeSlot(self, width, height):
+        best = None
+        for position, (_, _, slot_width, slot_height) in enumerate(self._free_slots):
+            if slot_width >= width and slot_height >= height and (best is None or slot_width * slot_height < best[1]):
+                best = (position, slot_width * slot_height)
+        if best is None:
+            return None
+        return self._free_slots.pop(best[0])
+
+    def _allocateOnShelf(self, width, height):
+        shelf_height = -(-height // SHELF_HEIGHT_STEP) * SHELF_HEIGHT_STEP
+        # Rather start a new shelf than put a rectangle on a shelf that is more than twice as high.
+        shelf = self._findShelf(width, height, 2 * shelf_height)
+        if shelf is None:
+            shelf = self._addShelf(shelf_height, height)
+        if shelf is None:
+            shelf = self._findShelf(width, height, self._height)
+        if shelf is None:
+            return None
+
+        slot = (shelf[2], shelf[0], width, shelf[1])
+        shelf[2] += width
+        return slot
+
+    ##  The lowest shelf with room for the rectangle that is not higher than max_height.
+    def _findShelf(self, width, height, max_height):
+        best = None
+        for shelf in self._shelves:
+            if height <= shelf[1] <= max_height and shelf[2] + width <= self._width and (best is None or shelf[1] < best[1]):
+                best = shelf
+        return best
+
+    def _addShelf(self, shelf_height, height):
+        top = self._shelves[-1][0] + self._shelves[-1][1] if self._shelves else 0
+        if top + height > self._height:
+            return None
+        shelf = [top, min(shelf_height, self._height - top), 0]
+        self._shelves.append(shelf)
+        return shelf
@@ -0,0 +1,260 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+# The only Uranium classes this module uses. benchmarks/benchmark_reports.py registers stand-ins for these modules, so
+# keep the imports to these names.
+from UM.Settings.DefinitionContainer import DefinitionContainer
+from UM.Settings.SettingDefinition import SettingDefinition
+from UM.Settings.SettingFunction import SettingFunction
+
+from .ContainerSnapshot import ContainerSnapshot
+from .SettingDependencyGraph import SettingDependencyGraph
+
+import json
+import time
+
+setting_prop_names = sorted(SettingDefinition.getPropertyNames())
+stack_prop_names = ["resolve", "value"]
+# Definition properties that make a stack do more than return the first value found in its containers.
+stack_control_prop_names = ["limit_to_extruder", "resolve", "settable_per_extruder"]
+# The value of every key is evaluated this often for the dependency graph, and the fastest time is kept.
+evaluation_repeats = 3
+
+
+##  Copies containers and stacks into ContainerSnapshots.
+#
+#   This must run on the main thread. A builder remembers what it has already copied, so containers that are
+#   shared between several stacks are only copied once per report. If a ChangeTracker is given, the snapshots
+#   get change tokens so their rendered HTML can be cached.
+class SnapshotBuilder:
+    def __init__(self, change_tracker=None):
+        self._change_tracker = change_tracker
+        self._snapshots = {}
+        self._raw_properties = {}
+
+    def snapshotContainer(self, container, properties=setting_prop_names, with_keys=True):
+        memo_key = (id(container), tuple(properties) if with_keys else ())
+        snapshot = self._snapshots.get(memo_key)
+        if snapshot is None:
+            settings = self._settings(container, properties) if with_keys else {}
+            token = self._change_tracker.containerToken(container) if self._change_tracker else None
+            snapshot = ContainerSnapshot(str(id(container)), str(safeCall(container.getId)), self._metaDataRows(container), settings, token=token)
+            snapshot.container_type = containerType(container)
+            self._snapshots[memo_key] = snapshot
+        return snapshot
+
+    def snapshotStack(self, stack, with_container_keys=True):
+        containers = [self.snapshotContainer(container, with_keys=with_container_keys) for container in stack.getContainers()]
+        token = self._change_tracker.stackToken(stack) if self._change_tracker else None
+        stack_properties = self._stackProperties(stack, stack_prop_names + ["enabled"])
+        snapshot = ContainerSnapshot(str(id(stack)), str(safeCall(stack.getId)), self._metaDataRows(stack), reprSettings(stack_properties, stack_prop_names), containers, token)
+        snapshot.facets = self._stackFacets(stack, stack_properties)
+        snapshot.container_type = containerType(stack)
+        return snapshot
+
+    ##  The keys that the setting functions of the stacks use, and how long the value of every key takes to evaluate
+    #   through each stack. The times include the evaluation of the keys that a value uses.
+    def settingDependencyGraph(self, stacks):
+        graph = SettingDependencyGraph()
+        for stack in stacks:
+            stack_name = str(safeCall(stack.getId))
+            containers = stack.getContainers()
+            next_stack = stack.getNextStack() if hasattr(stack, "getNextStack") else None
+            if next_stack is not None:
+                containers = containers + next_stack.getContainers()
+            layers = [self._rawProperties(container) for container in containers]
+
+            for key in stack.getAllKeys():
+                graph.addKey(key)
+                for prop_name in setting_prop_names:
+                    # The function that the stack evaluates is the one of the first container that has the property.
+                    function = next((layer[key][prop_name] for layer in layers if prop_name in layer.get(key, ())), None)
+                    if isinstance(function, SettingFunction):
+                        graph.addDependencies(key, prop_name, function.getUsedSettingKeys())
+
+                fastest = None
+                for _ in range(evaluation_repeats):
+                    start = time.perf_counter()
+                    self._getProperty(stack, key, "value")
+                    elapsed = time.perf_counter() - start
+                    fastest = elapsed if fastest is None else min(fastest, elapsed)
+                graph.addEvaluationTime(stack_name, key, fastest)
+        return graph
+
+    def _settings(self, container, properties):
+        if hasattr(container, "getContainers"):
+            return reprSettings(self._stackProperties(container, properties), properties)
+        return reprSettings(self._rawProperties(container), properties)
+
+    ##  Work out the facets of every key in a stack, which the key filter of a page can select on:
+    #
+    #   - "layer:<type>": the type of the container that supplies the value, "layer:next stack" if none does.
+    #   - "overridden": a lower container has a different value.
+    #   - "expression": the value is a setting function.
+    #   - "resolve": the key has a resolve property.
+    #   - "disabled": the setting is not enabled.
+    def _stackFacets(self, stack, stack_properties):
+        layers = [(containerType(container), self._rawProperties(container)) for container in stack.getContainers()]
+
+        facets = {}
+        for key, values in stack_properties.items():
+            key_facets = []
+            supplied = [layer[key]["value"] for _, layer in layers if "value" in layer.get(key, ())]
+            if supplied:
+                key_facets.append("layer:" + next(name for name, layer in layers if "value" in layer.get(key, ())))
+                if isinstance(supplied[0], SettingFunction):
+                    key_facets.append("expression")
+                if len(supplied) > 1 and repr(supplied[0]) != repr(supplied[1]):
+                    key_facets.append("overridden")
+            else:
+                key_facets.append("layer:next stack")
+            if "resolve" in values:
+                key_facets.append("resolve")
+            if values.get("enabled") is False:
+                key_facets.append("disabled")
+            facets[key] = key_facets
+        return facets
+
+    ##  Get all non-None property values of all keys in a container, in one pass over its settings.
+    #
+    #   Definition and instance containers are read through their definitions and instances directly, instead of
+    #   looking every key up again for every property. The result is shared by all stacks that use the container.
+    def _rawProperties(self, container):
+        raw_properties = self._raw_properties.get(id(container))
+        if raw_properties is not None:
+            return raw_properties
+
+        raw_properties = {}
+        prop_names = sorted(set(setting_prop_names) | set(stack_control_prop_names))
+        if hasattr(container, "findDefinitions"):
+            for definition in container.findDefinitions():
+                values = {}
+                for prop_name in prop_names:
+                    value = getattr(definition, prop_name, None)
+                    if value is None and prop_name == "value":
+                        value = getattr(definition, "default_value", None)
+                    if value is not None:
+                        values[prop_name] = value
+                raw_properties[definition.key] = values
+        elif hasattr(container, "findInstances"):
+            for instance in container.findInstances():
+                values = {}
+                for prop_name in prop_names:
+                    value = getattr(instance, prop_name, None)
+                    if value is not None:
+                        values[prop_name] = value
+                raw_properties[instance.definition.key] = values
+        elif hasattr(container, "getAllKeys"):
+            for key in container.getAllKeys():
+                values = {}
+                for prop_name in prop_names:
+                    value = self._getProperty(container, key, prop_name)
+                    if value is not None:
+                        values[prop_name] = value
+                raw_properties[key] = values
+
+        self._raw_properties[id(container)] = raw_properties
+        return raw_properties
+
+    ##  Resolve the properties of all keys in a stack from the raw properties of its containers.
+    #
+    #   A value is taken straight from the first container that has it, or from the already resolved next stack.
+    #   The stack's getProperty() is only used for values that need evaluation (setting functions), and for keys
+    #   where the stack does more than a plain lookup: "resolve", "limit_to_extruder" and extruder settings that
+    #   are not settable per extruder.
+    def _stackProperties(self, stack, properties):
+        memo_key = (id(stack), tuple(properties))
+        stack_properties = self._raw_properties.get(memo_key)
+        if stack_properties is not None:
+            return stack_properties
+
+        containers = stack.getContainers()
+        layers = [self._rawProperties(container) for container in containers]
+        next_stack = stack.getNextStack() if hasattr(stack, "getNextStack") else None
+        definition_containers = containers + (next_stack.getContainers() if next_stack is not None else [])
+        definition_layers = [self._rawProperties(container) for container in definition_containers if hasattr(container, "findDefinitions")]
+
+        stack_properties = {}
+        for key in stack.getAllKeys():
+            definition = next((layer[key] for layer in definition_layers if key in layer), None)
+            needs_stack = definition is None or limitsToExtruder(definition.get("limit_to_extruder")) \
+                          or (next_stack is not None and definition.get("settable_per_extruder") is not True)
+
+            values = {}
+            for prop_name in properties:
+                if needs_stack or (prop_name == "value" and definition.get("resolve") is not None):
+                    value = self._getProperty(stack, key, prop_name)
+                else:
+                    value = next((layer[key][prop_name] for layer in layers if prop_name in layer.get(key, ())), None)
+                    if isinstance(value, SettingFunction):
+                        value = self._getProperty(stack, key, prop_name)
+                    elif value is None and next_stack is not None:
+                        value = self._stackProperties(next_stack, properties).get(key, {}).get(prop_name)
+                if value is not None:
+                    values[prop_name] = value
+            stack_properties[key] = values
+
+        self._raw_properties[memo_key] = stack_properties
+        return stack_properties
+
+    # All getProperty() calls go through here, so they can be counted, see Instrumentation.
+    def _getProperty(self, container, key, prop_name):
+        return container.getProperty(key, prop_name)
+
+    def _metaDataRows(self, container):
+        rows = []
+        try:
+            rows.append(("<type>",) + metaDataText(type(container)))
+            rows.append(("<id>",) + metaDataText(container))
+            rows.append(("id",) + metaDataText(safeCall(container.getId)))
+            rows.append(("name",) + metaDataText(safeCall(container.getName)))
+            if hasattr(container, "_getDefinition"):
+                rows.append(("definition",) + metaDataText(safeCall(container._getDefinition)))
+            rows.append(("read only",) + metaDataText(safeCall(container.isReadOnly)))
+            rows.append(("path",) + metaDataText(safeCall(container.getPath)))
+            rows.append(("metadata",) + metaDataText(safeCall(container.getMetaData)))
+        except:
+            pass
+        return rows
+
+##  Whether a "limit_to_extruder" property takes the value from an extruder. Cura defines it for every key, with
+#   "-1" for no limit, like GlobalStack and ExtruderStack check it.
+def limitsToExtruder(limit_to_extruder):
+    return limit_to_extruder is not None and str(limit_to_extruder).strip() != "-1"
+
+##  The current properties of one key in a container or stack, like they are in a snapshot.
+def keySettings(container, key, properties):
+    values = {}
+    for prop_name in properties:
+        prop_value = container.getProperty(key, prop_name)
+        if prop_value is not None:
+            values[prop_name] = repr(prop_value)
+    return values
+
+def containerType(container):
+    return str(safeCall(lambda: container.getMetaDataEntry("type", type(container).__name__)))
+
+##  Sort the keys, keep the given properties and convert their values to text.
+def reprSettings(raw_properties, properties):
+    settings = {}
+    for key in sorted(raw_properties):
+        values = raw_properties[key]
+        settings[key] = {prop_name: repr(values[prop_name]) for prop_name in properties if values.get(prop_name) is not None}
+    return settings
+
+##  Convert a metadata value to its display text and the css class of its row.
+def metaDataText(value):
+    if isinstance(value, Exception):
+        return str(value), "exception"
+    elif isinstance(value, dict):
+        return json.dumps(value, sort_keys=True, indent=4), "preformat"
+    elif isinstance(value, DefinitionContainer):
+        return value.getId() + " " + str(value), ""
+    else:
+        return str(value), ""
+
+def safeCall(callable):
+    try:
+        result = callable()
+        return result
+    except Exception as ex:
+        return ex
@@ -0,0 +1,177 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+from .CompactReport import StringTable
+from .ContainerSnapshot import ContainerSnapshot
+
+import hashlib
+import json
+import mmap
+import struct
+import zlib
+
+MAGIC = b"GODSNAP1"
+TRAILER = struct.Struct("<QQ")  # Offset and length of the header.
+
+# What a container was in the registry.
+DEFINITION = "definition"
+INSTANCE = "instance"
+STACK = "stack"
+
+##  Save container and stack snapshots to a file.
+#
+#   The file starts with MAGIC, followed by one zlib compressed JSON record per distinct container. Records are
+#   stored by the hash of their content, so identical containers are stored once. Setting keys and property names
+#   are stored once, in the header, and referred to by index. The header (zlib compressed JSON) comes last, and
+#   the file ends with its offset and length.
+#
+#   \param snapshots List of (kind, snapshot) tuples, where kind is DEFINITION, INSTANCE or STACK. The containers
+#   of stacks are saved along with them.
+#   \param info Dict with whatever describes the snapshot, like the printer and the Cura version.
+def saveSnapshotFile(path, snapshots, info):
+    keys = StringTable()
+    prop_names = StringTable()
+    blobs = {}
+    containers = []
+    stacks = []
+    saved = set()
+
+    with open(path, "wb") as fhandle:
+        fhandle.write(MAGIC)
+
+        def save(kind, snapshot):
+            if snapshot.anchor in saved:
+                return
+            saved.add(snapshot.anchor)
+            record = json.dumps(_record(snapshot, keys, prop_names), separators=(",", ":")).encode("utf-8")
+            content_hash = hashlib.blake2b(record, digest_size=16).hexdigest()
+            if content_hash not in blobs:
+                compressed = zlib.compress(record)
+                blobs[content_hash] = (fhandle.tell(), len(compressed))
+                fhandle.write(compressed)
+            containers.append([snapshot.anchor, content_hash, kind, snapshot.container_type])
+
+        for kind, snapshot in snapshots:
+            if snapshot.isStack():
+                for container in snapshot.containers:
+                    save(INSTANCE if container.container_type not in ("machine", "extruder") else DEFINITION, container)
+                stacks.append([snapshot.anchor, [container.anchor for container in snapshot.containers]])
+            save(kind, snapshot)
+
+        header = {"info": info, "keys": keys.strings, "props": prop_names.strings, "blobs": blobs, "containers": containers, "stacks": stacks}
+        header_data = zlib.compress(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+        header_offset = fhandle.tell()
+        fhandle.write(header_data)
+        fhandle.write(TRAILER.pack(header_offset, len(header_data)))
+
+def _record(snapshot, keys, prop_names):
+    settings = []
+    for key, prop_values in snapshot.settings.items():
+        settings.append(keys.intern(key))
+        settings.append(len(prop_values))
+        for prop_name, prop_value in prop_values.items():
+            settings.append(prop_names.intern(prop_name))
+            settings.append(prop_value)
+    facets = None
+    if snapshot.facets is not None:
+        facets = {}
+        for key, key_facets in snapshot.facets.items():
+            for facet in key_facets:
+                facets.setdefault(facet, []).append(keys.intern(key))
+    return {"id": snapshot.container_id, "metadata": snapshot.metadata_rows, "settings": settings, "facets": facets}
+
+
+##  A snapshot file written by saveSnapshotFile().
+#
+#   The file is memory mapped, and containers are only decompressed when they are loaded, so a large snapshot can
+#   be opened quickly and only the containers that are needed cost memory.
+class SnapshotFile:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+            if self._data[:len(MAGIC)] != MAGIC or len(self._data) < len(MAGIC) + TRAILER.size:
+                raise ValueError("Not a God Mode snapshot file: " + path)
+            header_offset, header_length = TRAILER.unpack(self._data[-TRAILER.size:])
+            self._header = json.loads(zlib.decompress(self._data[header_offset:header_offset + header_length]).decode("utf-8"))
+        except:
+            self._file.close()
+            raise
+
+        self.info = self._header["info"]
+        self._containers = {anchor: (content_hash, kind, container_type) for anchor, content_hash, kind, container_type in self._header["containers"]}
+        self._stacks = dict((anchor, children) for anchor, children in self._header["stacks"])
+        self._loaded = {}
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    ##  Anchors of the containers of one kind, in the order they were saved.
+    def anchors(self, kind):
+        return [anchor for anchor, _, container_kind, _ in self._header["containers"] if container_kind == kind]
+
+    def containerType(self, anchor):
+        return self._containers[anchor][2]
+
+    ##  Load the snapshot of a container or stack.
+    #   \param with_container_keys For a stack: whether its containers get their settings too, or only their
+    #   id and metadata.
+    def load(self, anchor, with_container_keys=True):
+        memo_key = (anchor, with_container_keys or anchor not in self._stacks)
+        snapshot = self._loaded.get(memo_key)
+        if snapshot is not None:
+            return snapshot
+
+        content_hash, _, container_type = self._containers[anchor]
+        record = self._record(content_hash)
+
+        keys = self._header["keys"]
+        prop_names = self._header["props"]
+        settings = {}
+        flat = record["settings"]
+        index = 0
+        while index < len(flat):
+            count = flat[index + 1]
+            settings[keys[flat[index]]] = {prop_names[flat[position]]: flat[position + 1] for position in range(index + 2, index + 2 + 2 * count, 2)}
+            index += 2 + 2 * count
+
+        children = None
+        if anchor in self._stacks:
+            children = [self.load(child) if with_container_keys else self._loadWithoutKeys(child) for child in self._stacks[anchor]]
+        # Identical content in the same place renders the same, so the token lets RenderCache share the work.
+        token = ("snapshot", content_hash, anchor)
+        snapshot = ContainerSnapshot(anchor, record["id"], [tuple(row) for row in record["metadata"]], settings, children, token)
+        snapshot.container_type = container_type
+        if record["facets"] is not None:
+            snapshot.facets = {key: [] for key in settings}
+            for facet, key_indices in record["facets"].items():
+                for key_index in key_indices:
+                    snapshot.facets[keys[key_index]].append(facet)
+        self._loaded[memo_key] = snapshot
+        return snapshot
+
+    ##  The snapshot of a container without its settings, like SnapshotBuilder makes for the containers of a stack
+    #   with with_container_keys=False. The settings are not decoded at all.
+    def _loadWithoutKeys(self, anchor):
+        memo_key = ("without keys", anchor)
+        snapshot = self._loaded.get(memo_key)
+        if snapshot is not None:
+            return snapshot
+
+        content_hash, _, container_type = self._containers[anchor]
+        record = self._record(content_hash)
+        snapshot = ContainerSnapshot(anchor, record["id"], [tuple(row) for row in record["metadata"]], {}, token = ("snapshot without keys", content_hash, anchor))
+        snapshot.container_type = container_type
+        self._loaded[memo_key] = snapshot
+        return snapshot
+
+    def _record(self, content_hash):
+        offset, length = self._header["blobs"][content_hash]
+        return json.loads(zlib.decompress(self._data[offset:offset + length]).decode("utf-8"))
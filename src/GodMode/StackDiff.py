@@ -0,0 +1,46 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+
+##  Compare the settings of two snapshots.
+#
+#   Snapshot settings are sorted by key, so both sides are walked once, side by side.
+#   \return A generator of (key, left properties, right properties) for every key that differs. The properties
+#   of a key that only exists on one side are None on the other side.
+def diffSettings(left_settings, right_settings):
+    left_keys = list(left_settings)
+    right_keys = list(right_settings)
+    left_index = 0
+    right_index = 0
+    while left_index < len(left_keys) and right_index < len(right_keys):
+        left_key = left_keys[left_index]
+        right_key = right_keys[right_index]
+        if left_key == right_key:
+            if left_settings[left_key] != right_settings[right_key]:
+                yield left_key, left_settings[left_key], right_settings[right_key]
+            left_index += 1
+            right_index += 1
+        elif left_key < right_key:
+            yield left_key, left_settings[left_key], None
+            left_index += 1
+        else:
+            yield right_key, None, right_settings[right_key]
+            right_index += 1
+
+    for left_key in left_keys[left_index:]:
+        yield left_key, left_settings[left_key], None
+    for right_key in right_keys[right_index:]:
+        yield right_key, None, right_settings[right_key]
+
+##  Compare the containers of two stack snapshots, by position from the top.
+#   \return A list of (position, left container id, right container id) for every position that differs.
+def diffContainers(left_stack, right_stack):
+    left_ids = [container.container_id for container in left_stack.containers]
+    right_ids = [container.container_id for container in right_stack.containers]
+    differences = []
+    for position in range(max(len(left_ids), len(right_ids))):
+        left_id = left_ids[position] if position < len(left_ids) else None
+        right_id = right_ids[position] if position < len(right_ids) else None
+        if left_id != right_id:
+            differences.append((position, left_id, right_id))
+    return differences
@@ -1,11 +1,7 @@
 # Copyright (c) 2016 Ultimaker B.V.
 # Cura is released under the terms of the AGPLv3 or higher.
 
-from . import GodMode
-from . import GodView
-
-from UM.i18n import i18nCatalog
-catalog = i18nCatalog("cura")
+# GodMode and GodView are imported in register(), so the report modules can be used without Cura (see RenderReports).
 
 def getMetaData():
     return {
@@ -16,4 +12,6 @@ def getMetaData():
     }
 
 def register(app):
+    from . import GodMode
+    from . import GodView
     return {"extension": GodMode.GodMode(), "view": GodView.GodView()}